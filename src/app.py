@@ -3,70 +3,113 @@ Application principale Streamlit - RAG Legal Chatbot
 Version AMÉLIORÉE avec design responsive et optimisations
 Cabinet Parenti - Assistant Juridique IA
 """
+import os
+import re
 import sys
+import atexit
 from pathlib import Path
+from typing import TYPE_CHECKING
+from collections import Counter
 
-# Ajouter le répertoire racine au PYTHONPATH
-ROOT_DIR = Path(__file__).parent.parent
-sys.path.insert(0, str(ROOT_DIR))
+# Le projet s'installe en mode éditable (pip install -e .) ; le PYTHONPATH n'est
+# modifié qu'en repli, si le package n'est pas installé
+try:
+    import src  # noqa: F401
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import streamlit as st
 from loguru import logger
 
-from src.config.settings import LOGS_DIR, APP_TITLE, APP_ICON
-from src.utils.document_processor import DocumentProcessor
-from src.utils.vector_store import VectorStoreManager
-from src.utils.llm_handler import LLMHandler
-from src.components.chat_interface import render_chat_interface
-from src.components.document_manager import render_document_manager
-from src.utils.conversation_manager import ConversationManager
-
-# Configuration du logging
-logger.remove()
-logger.add(
-    sys.stderr,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>",
-    level="INFO"
-)
-logger.add(
-    LOGS_DIR / "app_{time:YYYY-MM-DD}.log",
-    rotation="1 day",
-    retention="7 days",
-    level="DEBUG",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function} - {message}"
-)
+from src.config.settings import LOGS_DIR, LOG_LEVEL, APP_TITLE, APP_ICON, SUPPORTED_EXTENSIONS, MAX_SESSION_MESSAGES
+
+# Ressources statiques de l'interface (feuille de style)
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+
+# Les modules RAG (LangChain, FAISS/Chroma, OpenAI) sont importés à la demande,
+# dans les factories en cache ou dans la branche de la page affichée
+if TYPE_CHECKING:
+    from src.utils.document_processor import DocumentProcessor
+    from src.utils.vector_store import VectorStoreManager
+    from src.utils.llm_handler import LLMHandler
+    from src.utils.conversation_manager import ConversationManager
+
+
+@st.cache_resource
+def _configure_logging():
+    """
+    Configure les sinks loguru une seule fois par processus
+
+    Streamlit ré-exécute ce script à chaque rerun : sans garde, les handlers
+    seraient supprimés puis recréés à chaque interaction. st.cache_resource
+    sérialise le premier appel entre sessions concurrentes ; l'attribut posé
+    sur le logger couvre un vidage du cache (menu "Clear cache").
+    """
+    if getattr(logger, "_app_configured", False):
+        return
+    
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>",
+        level="INFO"
+    )
+    logger.add(
+        LOGS_DIR / "app_{time:YYYY-MM-DD}.log",
+        rotation="1 day",
+        retention="7 days",
+        level=LOG_LEVEL,
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function} - {message}",
+        enqueue=True,  # Écriture sur disque dans un thread dédié (hors du rerun)
+        backtrace=False,
+        diagnose=False
+    )
+    # Vider la file d'attente des logs à l'arrêt du processus
+    atexit.register(logger.complete)
+    logger._app_configured = True
+
+
+# Pages de l'application (valeurs acceptées pour ?page=...)
+_PAGES = ("chat", "documents")
+
+# Ordre d'affichage des types de fichiers dans la sidebar Documents
+_EXT_ORDER = tuple(SUPPORTED_EXTENSIONS)
 
 
 def main():
     """Point d'entrée principal de l'application"""
     
-    # Configuration de la page
-    st.set_page_config(
-        page_title=APP_TITLE,
-        page_icon=APP_ICON,
-        layout="wide",
-         initial_sidebar_state="expanded"
-    )
+    # Configuration de la page (une fois par session : le navigateur la conserve)
+    if not st.session_state.get("_page_config_done"):
+        st.set_page_config(
+            page_title=APP_TITLE,
+            page_icon=APP_ICON,
+            layout="wide",
+            initial_sidebar_state="expanded"
+        )
+        st.session_state._page_config_done = True
     
     # CSS optimisé
     _inject_optimized_css()
     
-    # Initialiser les composants (avec cache)
+    # Initialiser les composants communs aux deux pages (avec cache) ; les autres
+    # sont créés à la première visite de la page qui les utilise
     vector_store_manager = _get_vector_store_manager()
-    document_processor = _get_document_processor()
-    llm_handler = _get_llm_handler(vector_store_manager)
-    conversation_manager = _get_conversation_manager()
     
-    # Initialiser la page
+    # Initialiser la page (depuis l'URL : lien direct ou rafraîchissement)
     if "page" not in st.session_state:
-        st.session_state.page = "chat"
+        page = st.query_params.get("page", "chat")
+        st.session_state.page = page if page in _PAGES else "chat"
     
     # Initialiser l'état de la sidebar custom
     if "sidebar_open" not in st.session_state:
         st.session_state.sidebar_open = True
     
+    # Page courante lue une seule fois (les callbacks de navigation la modifient avant le rerun)
+    page = st.session_state.page
+    
     # Contenu du header selon la page
-    if st.session_state.page == "chat":
+    if page == "chat":
         page_title = "💬 Assistant Juridique IA"
         page_subtitle = "Posez vos questions sur les documents du cabinet en toute confidentialité"
     else:
@@ -95,12 +138,16 @@ def main():
     """, unsafe_allow_html=True)
     
     # ========== SIDEBAR CUSTOM ==========
-    _render_sidebar_toggle(conversation_manager, vector_store_manager)
+    _render_sidebar_toggle(vector_store_manager)
     
     # ========== CONTENU PRINCIPAL ==========
-    if st.session_state.page == "chat":
-        render_chat_interface(llm_handler, vector_store_manager, conversation_manager)
-    elif st.session_state.page == "documents":
+    if page == "chat":
+        from src.components.chat_interface import render_chat_interface
+        llm_handler = _get_llm_handler(vector_store_manager)
+        render_chat_interface(llm_handler, vector_store_manager, _get_conversation_manager())
+    elif page == "documents":
+        from src.components.document_manager import render_document_manager
+        document_processor = _get_document_processor()
         render_document_manager(vector_store_manager, document_processor)
     
     # Footer
@@ -112,7 +159,18 @@ def main():
     """, unsafe_allow_html=True)
 
 
-def _render_sidebar_toggle(conversation_manager: ConversationManager, vector_store_manager: VectorStoreManager):
+def _set_session_value(key: str, value):
+    """Callback de bouton : affecte une valeur dans st.session_state"""
+    st.session_state[key] = value
+
+
+def _navigate(page: str):
+    """Callback de navigation : met à jour la page courante et l'URL (?page=...)"""
+    st.session_state.page = page
+    st.query_params["page"] = page
+
+
+def _render_sidebar_toggle(vector_store_manager: "VectorStoreManager"):
     """Gestion unifiée du toggle de la sidebar"""
     
     if st.session_state.sidebar_open:
@@ -121,14 +179,13 @@ def _render_sidebar_toggle(conversation_manager: ConversationManager, vector_sto
             # Bouton fermer en haut
             col1, col2 = st.columns([5, 1])
             with col2:
-                if st.button("✖", key="close_sidebar", help="Fermer le menu"):
-                    st.session_state.sidebar_open = False
-                    st.rerun()
+                st.button("✖", key="close_sidebar", help="Fermer le menu",
+                          on_click=_set_session_value, args=("sidebar_open", False))
             
             st.markdown("<div style='margin: 1rem 0;'></div>", unsafe_allow_html=True)
             
             # Contenu de la sidebar
-            _render_sidebar_content(conversation_manager, vector_store_manager)
+            _render_sidebar_content(vector_store_manager)
     
     else:
         # MINI SIDEBAR (60px)
@@ -136,103 +193,117 @@ def _render_sidebar_toggle(conversation_manager: ConversationManager, vector_sto
         
         with st.sidebar:
             st.markdown("<div style='margin: 1rem 0;'></div>", unsafe_allow_html=True)
-            if st.button("☰", key="open_sidebar", use_container_width=True):
-                st.session_state.sidebar_open = True
-                st.rerun()
+            st.button("☰", key="open_sidebar", use_container_width=True,
+                      on_click=_set_session_value, args=("sidebar_open", True))
 
 
-def _render_sidebar_content(conversation_manager: ConversationManager, vector_store_manager: VectorStoreManager):
+def _render_sidebar_content(vector_store_manager: "VectorStoreManager"):
     """Contenu complet de la sidebar"""
     
+    # Page courante lue une seule fois (accès direct plutôt que via le proxy de session)
+    page = st.session_state.page
+    
     # ========== NAVIGATION ==========
-    if st.button("💬 Interface Chat", key="nav_chat", use_container_width=True,
-                 type="primary" if st.session_state.page == "chat" else "secondary"):
-        st.session_state.page = "chat"
-        st.rerun()
+    # Les callbacks on_click modifient l'état avant le rerun déclenché par le clic :
+    # un seul passage du script suffit, sans st.rerun() explicite
+    st.button("💬 Interface Chat", key="nav_chat", use_container_width=True,
+              type="primary" if page == "chat" else "secondary",
+              on_click=_navigate, args=("chat",))
     
-    if st.button("📁 Gestion Documents", key="nav_docs", use_container_width=True,
-                 type="primary" if st.session_state.page == "documents" else "secondary"):
-        st.session_state.page = "documents"
-        st.rerun()
+    st.button("📁 Gestion Documents", key="nav_docs", use_container_width=True,
+              type="primary" if page == "documents" else "secondary",
+              on_click=_navigate, args=("documents",))
     
     st.markdown("<div style='margin: 1.5rem 0; border-top: 1px solid rgba(255,255,255,0.2);'></div>", 
                 unsafe_allow_html=True)
     
     # ========== CONTENU CONTEXTUEL ==========
-    if st.session_state.page == "chat":
-        _render_chat_sidebar(conversation_manager)
+    if page == "chat":
+        _render_chat_sidebar(_get_conversation_manager())
     else:
         _render_documents_sidebar(vector_store_manager)
 
 
-def _render_chat_sidebar(conversation_manager: ConversationManager):
-    """Sidebar pour la page Chat"""
+@st.fragment
+def _render_chat_sidebar(conversation_manager: "ConversationManager"):
+    """
+    Sidebar pour la page Chat
     
-    st.markdown("<h3 style='color: white; font-size: 0.95rem; margin-bottom: 1rem;'>📝 Historique</h3>", 
-                unsafe_allow_html=True)
+    Rendue comme fragment : un clic dans cette zone ne ré-exécute que la sidebar,
+    sauf quand la zone de chat doit elle aussi être redessinée.
+    """
+    
+    st.subheader("📝 Historique")
     
     # Bouton nouvelle conversation
     if st.button("➕ Nouvelle conversation", key="new_conv", use_container_width=True):
-        if st.session_state.get("chat_history"):
-            conversation_manager.save_conversation(
-                st.session_state.current_conversation_id,
-                st.session_state.chat_history
-            )
+        # Les messages sont déjà dans le journal de la conversation : rien à sauvegarder
+        had_history = bool(st.session_state.get("chat_history"))
         new_id = conversation_manager.generate_conversation_id()
         st.session_state.current_conversation_id = new_id
         st.session_state.chat_history = []
-        logger.info(f"✨ Nouvelle conversation: {new_id}")
-        st.rerun()
+        st.session_state.archived_count = 0
+        logger.info("✨ Nouvelle conversation: {}", new_id)
+        
+        # La zone de chat n'a besoin d'être redessinée que si elle affichait des messages
+        if had_history:
+            st.rerun(scope="app")
     
-    st.markdown("<h4 style='color: rgba(255,255,255,0.9); font-size: 0.85rem; margin: 1rem 0 0.5rem 0;'>Conversations récentes</h4>", 
-                unsafe_allow_html=True)
+    st.caption("Conversations récentes")
     
-    # Historique des conversations
-    conversations = conversation_manager.list_conversations()
+    # Historique des conversations : un seul widget de sélection + une action de suppression
+    conversations = conversation_manager.list_conversations(limit=10)
     
     if not conversations:
         st.markdown("<p style='color: rgba(255,255,255,0.6); font-size: 0.85rem;'>Aucune conversation</p>", 
                     unsafe_allow_html=True)
-    else:
-        for conv in conversations[:10]:
-            is_current = conv["id"] == st.session_state.get("current_conversation_id", "")
-            
-            col1, col2 = st.columns([4, 1])
-            
-            with col1:
-                title = conv['title'] if len(conv['title']) <= 25 else conv['title'][:25] + '...'
-                button_label = f"📝 {title}"
-                if st.button(button_label, key=f"load_{conv['id']}", use_container_width=True, 
-                        disabled=is_current):
-                    _load_conversation(conversation_manager, conv["id"])
-            
-            with col2:
-                if st.button("🗑️", key=f"del_conv_{conv['id']}", help="Supprimer"):
-                    success = conversation_manager.delete_conversation(conv["id"])
-                    if success:
-                        if is_current:
-                            new_id = conversation_manager.generate_conversation_id()
-                            st.session_state.current_conversation_id = new_id
-                            st.session_state.chat_history = []
-                        st.success(f"✅ Conversation supprimée")
-                        st.rerun()
-
-
-def _render_documents_sidebar(vector_store_manager: VectorStoreManager):
-    """Sidebar pour la page Documents avec statistiques"""
+        return
     
-    st.markdown("<h3 style='color: white; font-size: 0.95rem; margin-bottom: 1rem;'>📊 Statistiques</h3>", 
-                unsafe_allow_html=True)
+    current_id = st.session_state.get("current_conversation_id", "")
+    # Libellés issus des métadonnées précalculées à la sauvegarde (display_title, tooltip)
+    labels = {conv["id"]: f"📝 {conv['display_title']}" for conv in conversations}
+    conv_ids = list(labels)
+    
+    # Clé fixe : la sélection est resynchronisée quand la conversation courante
+    # change ailleurs (nouvelle conversation, suppression, première sauvegarde)
+    # ou quand Streamlit a supprimé l'état du widget (radio non affiché lors
+    # d'un run : page Documents, sidebar repliée), sans créer un nouvel état
+    # de widget par conversation dans st.session_state
+    sync_token = (current_id, current_id in labels)
+    if "conv_select" not in st.session_state or st.session_state.get("_conv_select_synced") != sync_token:
+        st.session_state.conv_select = current_id if current_id in labels else None
+        st.session_state._conv_select_synced = sync_token
+    
+    selected_id = st.radio(
+        "Conversations récentes",
+        options=conv_ids,
+        format_func=labels.__getitem__,
+        captions=[conv["tooltip"] for conv in conversations],
+        key="conv_select",
+        label_visibility="collapsed"
+    )
     
-    # Calculer les stats
-    sources = vector_store_manager.get_all_sources()
-    doc_count = len(sources)
+    if selected_id and selected_id != current_id:
+        _load_conversation(conversation_manager, selected_id)
     
-    # Types de documents
-    doc_types = {}
-    for source in sources:
-        ext = Path(source).suffix.lower()
-        doc_types[ext] = doc_types.get(ext, 0) + 1
+    if current_id in labels:
+        if st.button("🗑️ Supprimer la conversation", key="del_conv", use_container_width=True):
+            if conversation_manager.delete_conversation(current_id):
+                st.session_state.current_conversation_id = conversation_manager.generate_conversation_id()
+                st.session_state.chat_history = []
+                st.session_state.archived_count = 0
+                st.toast("✅ Conversation supprimée")
+                st.rerun(scope="app")
+
+
+@st.fragment
+def _render_documents_sidebar(vector_store_manager: "VectorStoreManager"):
+    """Sidebar pour la page Documents avec statistiques (fragment, comme la sidebar Chat)"""
+    
+    st.subheader("📊 Statistiques")
+    
+    # Calculer les stats (cache invalidé dès que la base change de version)
+    doc_count, doc_types = _get_doc_type_histogram(vector_store_manager.version)
     
     # Afficher les métriques principales
     st.markdown(f"""
@@ -248,69 +319,150 @@ def _render_documents_sidebar(vector_store_manager: VectorStoreManager):
         </div>
     """, unsafe_allow_html=True)
     
-    # Répartition par type
+    # Répartition par type (titre + barres précalculés et mis en cache)
     if doc_types:
-        st.markdown("<h4 style='color: rgba(255,255,255,0.9); font-size: 0.85rem; margin: 1rem 0 0.5rem 0;'>Par type de fichier</h4>", 
-                    unsafe_allow_html=True)
-        
-        for ext, count in sorted(doc_types.items()):
-            percentage = (count / doc_count) * 100
-            st.markdown(f"""
-                <div style='margin-bottom: 0.5rem;'>
-                    <div style='display: flex; justify-content: space-between; font-size: 0.85rem; margin-bottom: 0.25rem;'>
-                        <span>{ext.upper()}</span>
-                        <span>{count} ({percentage:.0f}%)</span>
-                    </div>
-                    <div style='background: rgba(255,255,255,0.2); height: 6px; border-radius: 3px; overflow: hidden;'>
-                        <div style='background: linear-gradient(90deg, #4CAF50 0%, #81C784 100%); width: {percentage}%; height: 100%;'></div>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
+        st.markdown(_get_doc_type_panel_html(vector_store_manager.version), unsafe_allow_html=True)
 
 
-def _load_conversation(conversation_manager: ConversationManager, conversation_id: str):
+def _load_conversation(conversation_manager: "ConversationManager", conversation_id: str):
     """Charge une conversation"""
-    conversation_data = conversation_manager.load_conversation(conversation_id)
+    # Seuls les messages les plus récents sont gardés en session
+    conversation_data = conversation_manager.load_conversation(conversation_id, tail=MAX_SESSION_MESSAGES)
     
     if conversation_data:
         st.session_state.current_conversation_id = conversation_id
         st.session_state.chat_history = conversation_data["messages"]
-        st.session_state.message_count = len(conversation_data["messages"])
-        logger.info(f"📂 Conversation chargée: {conversation_id}")
+        st.session_state.archived_count = conversation_data["archived_count"]
+        logger.info("📂 Conversation chargée: {}", conversation_id)
         st.rerun()
 
 
 @st.cache_resource
-def _get_vector_store_manager() -> VectorStoreManager:
+def _get_vector_store_manager() -> "VectorStoreManager":
     """Initialise et cache le VectorStoreManager"""
-    logger.info("🔧 Initialisation du VectorStoreManager...")
+    from src.utils.vector_store import VectorStoreManager
+    logger.debug("🔧 Initialisation du VectorStoreManager...")
     return VectorStoreManager()
 
 
 @st.cache_resource
-def _get_document_processor() -> DocumentProcessor:
+def _get_document_processor() -> "DocumentProcessor":
     """Initialise et cache le DocumentProcessor"""
-    logger.info("🔧 Initialisation du DocumentProcessor...")
+    from src.utils.document_processor import DocumentProcessor
+    logger.debug("🔧 Initialisation du DocumentProcessor...")
     return DocumentProcessor()
 
 
 @st.cache_resource
-def _get_llm_handler(_vector_store_manager: VectorStoreManager) -> LLMHandler:
+def _get_llm_handler(_vector_store_manager: "VectorStoreManager") -> "LLMHandler":
     """Initialise et cache le LLMHandler"""
-    logger.info("🔧 Initialisation du LLMHandler...")
+    from src.utils.llm_handler import LLMHandler
+    logger.debug("🔧 Initialisation du LLMHandler...")
     return LLMHandler(_vector_store_manager)
 
 
 @st.cache_resource
-def _get_conversation_manager() -> ConversationManager:
+def _get_conversation_manager() -> "ConversationManager":
     """Initialise et cache le ConversationManager"""
-    logger.info("🔧 Initialisation du ConversationManager...")
+    from src.utils.conversation_manager import ConversationManager
+    logger.debug("🔧 Initialisation du ConversationManager...")
     return ConversationManager()
 
 
-def _inject_mini_sidebar_css():
-    """CSS pour la mini sidebar (60px)"""
-    st.markdown("""
+@st.cache_data(ttl=5)
+def _get_cached_stats(version: int) -> dict:
+    """
+    Cache les statistiques de la base vectorielle
+    
+    Args:
+        version: Version courante de la base (clé de cache)
+        
+    Returns:
+        Dictionnaire de statistiques (voir VectorStoreManager.get_stats)
+    """
+    return _get_vector_store_manager().get_stats()
+
+
+@st.cache_data(ttl=60)
+def _get_doc_type_histogram(version: int) -> tuple[int, dict]:
+    """
+    Cache le nombre de documents et leur répartition par extension
+    
+    Args:
+        version: Version courante de la base (clé de cache)
+        
+    Returns:
+        (nombre de documents, {extension: nombre})
+    """
+    sources = _get_cached_stats(version)["sources"]
+    # os.path.splitext évite de construire un objet Path par source
+    return len(sources), dict(Counter(os.path.splitext(source)[1].lower() for source in sources))
+
+
+@st.cache_data(ttl=60)
+def _get_doc_type_panel_html(version: int) -> str:
+    """
+    Construit le bloc HTML de répartition par type de fichier
+    
+    Args:
+        version: Version courante de la base (clé de cache)
+        
+    Returns:
+        HTML du titre et des barres de pourcentage
+    """
+    doc_count, doc_types = _get_doc_type_histogram(version)
+    total = doc_count or 1
+    
+    # Ordre d'affichage figé (extensions supportées), extensions inconnues à la fin
+    ordered_exts = [ext for ext in _EXT_ORDER if doc_types.get(ext)]
+    ordered_exts += sorted(set(doc_types) - set(_EXT_ORDER))
+    
+    # Largeurs des barres calculées une fois, hors du gabarit HTML
+    rows = [
+        (ext.upper(), doc_types[ext], doc_types[ext] * 100 / total)
+        for ext in ordered_exts
+    ]
+    
+    return "".join([
+        "<h4 style='color: rgba(255,255,255,0.9); font-size: 0.85rem; margin: 1rem 0 0.5rem 0;'>Par type de fichier</h4>",
+        *(
+            f"<div style='margin-bottom: 0.5rem;'>"
+            f"<div style='display: flex; justify-content: space-between; font-size: 0.85rem; margin-bottom: 0.25rem;'>"
+            f"<span>{label}</span><span>{count} ({pct:.0f}%)</span>"
+            f"</div>"
+            f"<div style='background: rgba(255,255,255,0.2); height: 6px; border-radius: 3px; overflow: hidden;'>"
+            f"<div style='background: linear-gradient(90deg, #4CAF50 0%, #81C784 100%); width: {pct:.1f}%; height: 100%;'></div>"
+            f"</div>"
+            f"</div>"
+            for label, count, pct in rows
+        )
+    ])
+
+
+@st.cache_resource
+def _get_minified_css(css: str) -> str:
+    """
+    Minifie un bloc CSS (commentaires et espaces superflus supprimés)
+    
+    Mis en cache par processus : le calcul n'est pas refait à chaque rerun.
+    
+    Args:
+        css: Bloc <style> brut
+        
+    Returns:
+        Bloc <style> minifié
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    # Espaces après le nom d'une propriété (en début de déclaration uniquement)
+    css = re.sub(r"([{;][\w-]+)\s*:\s*", r"\1:", css)
+    # Point-virgule inutile avant la fin d'un bloc
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+_MINI_SIDEBAR_CSS = """
         <style>
         section[data-testid="stSidebar"] {
             width: 70px !important;
@@ -320,589 +472,37 @@ def _inject_mini_sidebar_css():
             width: 70px !important;
         }
         </style>
-    """, unsafe_allow_html=True)
-
-
-def _inject_optimized_css():
-    """CSS optimisé avec contrôle total de la sidebar"""
-    st.markdown("""
-        <style>
-        /* Import Google Fonts */
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-        
-        /* ===== GLOBAL ===== */
-        * {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-        }
-        
-        /* ===== CACHER TOUS LES BOUTONS NATIFS STREAMLIT ===== */
-        [data-testid="stSidebarCollapsedControl"],
-        [data-testid="collapsedControl"],
-        section[data-testid="stSidebar"] button[kind="header"],
-        section[data-testid="stSidebar"] > div > button[kind="header"],
-        [data-testid="stSidebarNav"] + div button[aria-label],
-        section[data-testid="stSidebar"] [data-testid="baseButton-header"],
-        section[data-testid="stSidebar"] [data-testid="baseButton-headerNoPadding"],
-        section[data-testid="stSidebar"] button[aria-label="Close sidebar"] {
-            display: none !important;
-            visibility: hidden !important;
-            opacity: 0 !important;
-            pointer-events: none !important;
-        }
+    """
 
-        /* Forcer le masquage du conteneur du bouton > */
-        section[data-testid="stSidebar"] > div:first-child > div:first-child > button {
-            display: none !important;
-        }
-        
-        /* ===== HEADER GLOBAL FIXE ===== */
-        .global-header {
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            background: linear-gradient(135deg, #1e3a5f 0%, #2d5a8c 100%);
-            color: white;
-            z-index: 1002;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            display: flex;
-        }
 
-        .global-header .logo-section {
-            width: 336px;
-            min-width: 280px;
-            max-width: 336px;
-            padding: 1rem 1.5rem;
-            background: linear-gradient(135deg, #1a2f4a 0%, #234567 100%);
-            border-right: 2px solid rgba(255,255,255,0.2);
-        }
-
-        .global-header .content-section {
-            flex: 1;
-            padding: 1rem 2rem;
-            display: flex;
-            align-items: center;
-        }
+def _inject_mini_sidebar_css():
+    """CSS pour la mini sidebar (60px)"""
+    st.markdown(_get_minified_css(_MINI_SIDEBAR_CSS), unsafe_allow_html=True)
 
-        /* ===== SIDEBAR ===== */
-        [data-testid="stSidebar"] {
-            background: linear-gradient(180deg, #1e3a5f 0%, #2d5a8c 100%);
-            padding-top: 1px !important;
-            top: 125px !important;
-            /* Ensure the sidebar uses the full available height under the fixed header
-               and allows internal scrolling so the last item is not clipped. */
-            bottom: 0 !important;
-            height: calc(100vh - 125px) !important;
-            overflow-y: auto !important;
-            -webkit-overflow-scrolling: touch;
-            padding-bottom: 1.5rem !important; /* extra space so last item isn't against the edge */
-            box-sizing: border-box !important;
-        }
 
-        [data-testid="stSidebar"] > div:first-child {
-            padding-top: 1rem !important;
-        }
+@st.cache_resource
+def _load_app_css() -> str:
+    """
+    Lit et minifie la feuille de style de l'application (src/static/app.css)
+    
+    Returns:
+        Bloc <style> prêt à être injecté
+    """
+    css = (STATIC_DIR / "app.css").read_text(encoding="utf-8")
+    return _get_minified_css(f"<style>{css}</style>")
 
-        [data-testid="stSidebar"] * {
-            color: white !important;
-        }
 
-        /* Boutons de navigation sidebar */
-        [data-testid="stSidebar"] .stButton button {
-            background: rgba(255,255,255,0.1);
-            border: none;
-            color: white !important;
-            transition: all 0.3s;
-            font-weight: 500;
-            white-space: nowrap !important;
-            overflow: hidden !important;
-            text-overflow: ellipsis !important;
-            border-radius: 8px;
-        }
-        
-        [data-testid="stSidebar"] .stButton button:hover {
-            background: rgba(255,255,255,0.2);
-            transform: translateX(5px);
-        }
-        
-        [data-testid="stSidebar"] .stButton button[kind="primary"] {
-            background: rgba(255,255,255,0.25);
-            border-left: 4px solid #4CAF50;
-        }
-        
-        /* Bouton close (✖) */
-        [data-testid="stSidebar"] button[data-key="close_sidebar"] {
-            background: linear-gradient(135deg, #d32f2f 0%, #c62828 100%) !important;
-            color: white !important;
-            border-radius: 8px !important;
-            font-size: 1.2rem !important;
-            font-weight: bold !important;
-            padding: 0.5rem !important;
-            transition: all 0.3s ease !important;
-            box-shadow: 0 2px 8px rgba(211, 47, 47, 0.3) !important;
-        }
-        
-        [data-testid="stSidebar"] button[data-key="close_sidebar"]:hover {
-            background: linear-gradient(135deg, #f44336 0%, #d32f2f 100%) !important;
-            transform: scale(1.05) !important;
-        }
-        
-        /* Bouton open (☰) dans mini sidebar */
-        [data-testid="stSidebar"] button[data-key="open_sidebar"] {
-            background: linear-gradient(135deg, #1976d2 0%, #1565c0 100%) !important;
-            color: white !important;
-            border: none !important;
-            border-radius: 8px !important;
-            font-size: 1.5rem !important;
-            font-weight: bold !important;
-            padding: 0.75rem 0.75rem !important;
-            cursor: pointer !important;
-            box-shadow: 0 2px 8px rgba(25, 118, 210, 0.3) !important;
-            transition: all 0.3s ease !important;
-        }
-        
-        [data-testid="stSidebar"] button[data-key="open_sidebar"]:hover {
-            background: linear-gradient(135deg, #2196F3 0%, #1976d2 100%) !important;
-            transform: translateY(-2px) !important;
-            box-shadow: 0 4px 12px rgba(25, 118, 210, 0.4) !important;
-        }
-        
-        /* ===== MAIN CONTENT ===== */
-        .main {
-            background: #fafafa;
-            max-width: 1400px;
-            margin: 0 auto;
-        }
-        
-        .main .block-container {
-            max-width: 85%;
-            padding: 2rem;
-            padding-top: 110px;
-        }
-        
-        /* ===== CHAT MESSAGES ===== */
-        .message-container {
-            display: flex;
-            margin: 1rem 0;
-            animation: slideIn 0.3s ease-out;
-        }
-        
-        .user-message {
-            justify-content: flex-end;
-        }
-        
-        .assistant-message {
-            justify-content: flex-start;
-        }
-        
-        .message-bubble {
-            max-width: 70%;
-            padding: 1rem 1.25rem;
-            border-radius: 18px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-            animation: bubblePop 0.3s ease-out;
-        }
-        
-        .user-bubble {
-            background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
-            color: white;
-            border-bottom-right-radius: 4px;
-        }
-        
-        .assistant-bubble {
-            background: linear-gradient(135deg, #f5f5f5 0%, #eeeeee 100%);
-            color: #111827;
-            border-bottom-left-radius: 4px;
-        }
-        
-        .message-header {
-            font-weight: 600;
-            margin-bottom: 0.5rem;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }
-        
-        .message-content {
-            line-height: 1.6;
-        }
-        
-        .message-time {
-            font-size: 0.75rem;
-            opacity: 0.7;
-            margin-top: 0.5rem;
-            text-align: right;
-        }
-        
-        /* ===== INFO PANEL ===== */
-        .info-panel {
-            background: white;
-            border-radius: 12px;
-            padding: 1.5rem;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-            margin-bottom: 1rem;
-        }
-        
-        .info-panel h3 {
-            font-size: 1.1rem;
-            margin-bottom: 1rem;
-            color: #1e3a5f;
-            font-weight: 600;
-        }
-        
-        .info-box {
-            background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
-            padding: 1rem;
-            border-radius: 8px;
-            margin-bottom: 1rem;
-            border-left: 4px solid #1976d2;
-        }
-        
-        .info-box strong {
-            color: #1e3a5f !important;
-        }
-
-        .info-box small {
-            color: #4b5563 !important;
-        }
-        
-        /* ===== DOCUMENT CARDS ===== */
-        .doc-card {
-            background: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%);
-            border: 1px solid #e0e0e0;
-            border-radius: 10px;
-            padding: 1.5rem;
-            text-align: center;
-            transition: all 0.3s;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-            margin-bottom: 1rem;
-        }
-        
-        .doc-card:hover {
-            transform: translateY(-4px);
-            box-shadow: 0 8px 16px rgba(0,0,0,0.1);
-            border-color: #1976d2;
-        }
-        
-        .doc-icon {
-            font-size: 3rem;
-            margin-bottom: 0.75rem;
-        }
-        
-        .doc-name {
-            font-weight: 600;
-            color: #111827;
-            margin-bottom: 0.5rem;
-            font-size: 0.9rem;
-            overflow: hidden;
-            text-overflow: ellipsis;
-            white-space: nowrap;
-        }
-        
-        .doc-ext {
-            display: inline-block;
-            background: #1976d2;
-            color: white;
-            padding: 0.25rem 0.75rem;
-            border-radius: 6px;
-            font-size: 0.75rem;
-            font-weight: 600;
-        }
-        
-        /* ===== UPLOAD ZONE ===== */
-        .upload-zone {
-            border: 3px dashed #1976d2;
-            border-radius: 12px;
-            padding: 3rem;
-            text-align: center;
-            background: #f8f9fa;
-            transition: all 0.3s;
-        }
-        
-        .upload-zone:hover {
-            border-color: #1565c0;
-            background: #e3f2fd;
-        }
-        
-        .upload-icon {
-            font-size: 3rem;
-            margin-bottom: 1rem;
-        }
-        
-        /* ===== STAT CARD ===== */
-        .stat-card {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 2rem;
-            border-radius: 12px;
-            text-align: center;
-            box-shadow: 0 4px 12px rgba(102, 126, 234, 0.3);
-        }
-        
-        .stat-card h2 {
-            font-size: 1.3rem;
-            margin-bottom: 0.5rem;
-            opacity: 0.9;
-        }
-        
-        .stat-card .number {
-            font-size: 3rem;
-            font-weight: bold;
-            margin: 1rem 0;
-        }
-        
-        /* ===== PIPELINE ===== */
-        .pipeline-step {
-            background: linear-gradient(135deg, #f5f5f5 0%, #e0e0e0 100%);
-            padding: 1.5rem;
-            border-radius: 10px;
-            text-align: center;
-        }
-        
-        .pipeline-step h4 {
-            font-size: 1.2rem;
-            margin-bottom: 1rem;
-            color: #1e3a5f;
-            font-weight: 600;
-        }
-        
-        .pipeline-step ul {
-            list-style: none;
-            text-align: left;
-            color: #666;
-            padding: 0;
-        }
-        
-        .pipeline-step li {
-            padding: 0.3rem 0;
-            font-size: 0.9rem;
-        }
-        
-        /* ===== BUTTONS ===== */
-        .stButton button {
-            border-radius: 8px;
-            font-weight: 500;
-            transition: all 0.3s;
-        }
-        
-        .stButton button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-        }
-        
-        .stButton button[kind="primary"] {
-            background: linear-gradient(135deg, #1976d2 0%, #1565c0 100%);
-        }
-        
-        /* ===== INPUT STYLING ===== */
-        .stTextInput input {
-            border: 2px solid #e5e7eb !important;
-            border-radius: 12px !important;
-            padding: 0.75rem 1rem !important;
-            transition: all 0.3s !important;
-        }
-        
-        .stTextInput input:focus {
-            border-color: #3b82f6 !important;
-            box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1) !important;
-        }
-        
-        /* ===== ANIMATIONS ===== */
-        @keyframes slideIn {
-            from {
-                opacity: 0;
-                transform: translateY(10px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        @keyframes bubblePop {
-            0% {
-                transform: scale(0.9);
-            }
-            50% {
-                transform: scale(1.02);
-            }
-            100% {
-                transform: scale(1);
-            }
-        }
-        
-        /* ===== SCROLLBAR ===== */
-        ::-webkit-scrollbar {
-            width: 8px;
-            height: 8px;
-        }
-        
-        ::-webkit-scrollbar-track {
-            background: #f1f1f1;
-        }
-        
-        ::-webkit-scrollbar-thumb {
-            background: #888;
-            border-radius: 4px;
-        }
-        
-        ::-webkit-scrollbar-thumb:hover {
-            background: #555;
-        }
-        
-        /* ===== RESPONSIVE DESIGN ===== */
-        @media (max-width: 768px) {
-            .global-header .logo-section {
-                width: 200px;
-                min-width: 180px;
-                padding: 0.75rem 1rem;
-            }
-            
-            .global-header .logo-section > div > div:first-child {
-                font-size: 1.5rem;
-            }
-            
-            .global-header .content-section {
-                padding: 0.75rem 1rem;
-            }
-            
-            .main .block-container {
-                max-width: 100%;
-                padding: 1rem;
-                padding-top: 100px;
-            }
-            
-            .message-bubble {
-                max-width: 90%;
-                padding: 0.75rem 1rem;
-            }
-            
-            .doc-card {
-                padding: 1rem;
-            }
-            
-            .upload-zone {
-                padding: 2rem 1rem;
-            }
-            
-            .stat-card {
-                padding: 1.5rem;
-            }
-            
-            .pipeline-step {
-                padding: 1rem;
-                margin-bottom: 1rem;
-            }
-            
-            .info-panel {
-                padding: 1rem;
-            }
-        }
-        
-        @media (max-width: 480px) {
-            .global-header .logo-section {
-                width: 150px;
-                min-width: 150px;
-            }
-            
-            .global-header .logo-section > div > div {
-                font-size: 0.9rem !important;
-            }
-            
-            .global-header .content-section h1 {
-                font-size: 1.1rem !important;
-            }
-            
-            .message-bubble {
-                max-width: 95%;
-                font-size: 0.9rem;
-            }
-            
-            .stat-card .number {
-                font-size: 2rem;
-            }
-        }
-        
-        /* ===== HIDE STREAMLIT DEFAULT ELEMENTS ===== */
-        #MainMenu {visibility: hidden;}
-        footer {visibility: hidden;}
-        header {visibility: hidden;}
-        
-        /* Cacher le bouton collapse par défaut de la sidebar ">" */
-        [data-testid="collapsedControl"] {
-            display: none !important;
-            visibility: hidden !important;
-            opacity: 0 !important;
-            pointer-events: none !important;
-        }
-        
-        [data-testid="collapsedControl"]:hover {
-            display: none !important;
-            visibility: hidden !important;
-        }
-        
-        button[kind="header"] {
-            display: none !important;
-            visibility: hidden !important;
-        }
-        
-        [data-testid="stSidebarNav"] {
-            display: none !important;
-            visibility: hidden !important;
-        }
-        
-        /* Forcer le masquage du chevron même au hover */
-        section[data-testid="stSidebar"] > div:first-child > button {
-            display: none !important;
-            visibility: hidden !important;
-            opacity: 0 !important;
-        }
-        
-        /* Alternative: cibler directement l'élément SVG du chevron */
-        [data-testid="stSidebar"] svg[data-testid="stSidebarNavSeparator"] {
-            display: none !important;
-        }
-        
-        /* Masquer TOUS les éléments de contrôle de la sidebar */
-        [data-testid="stSidebar"] [data-testid="baseButton-header"],
-        [data-testid="stSidebar"] [data-testid="baseButton-headerNoPadding"],
-        [data-testid="stSidebar"] button[aria-label*="collapse"],
-        [data-testid="stSidebar"] button[aria-label*="Collapse"] {
-            display: none !important;
-            visibility: hidden !important;
-            opacity: 0 !important;
-            width: 0 !important;
-            height: 0 !important;
-            pointer-events: none !important;
-        }
-        
-        /* Masquer le container du bouton de collapse */
-        [data-testid="stSidebar"] > div:first-child {
-            padding-top: 0 !important;
-        }
-        
-        [data-testid="stSidebar"] > div:first-child > div:first-child {
-            display: none !important;
-        }
-        
-        /* ===== TOAST NOTIFICATIONS ===== */
-        .stToast {
-            background: linear-gradient(135deg, #4CAF50 0%, #66BB6A 100%);
-            color: white;
-            border-radius: 8px;
-        }
-        
-        /* ===== ZOOM ===== */
-        html, body, .main, .block-container { zoom: 0.99 !important; }
-        </style>
-    """, unsafe_allow_html=True)
+def _inject_optimized_css():
+    """CSS optimisé avec contrôle total de la sidebar"""
+    st.markdown(_load_app_css(), unsafe_allow_html=True)
 
 
 if __name__ == "__main__":
+    _configure_logging()
     try:
         logger.info("🚀 Démarrage de l'application RAG Legal Chatbot v2.0")
         main()
     except Exception as e:
-        logger.error(f"❌ Erreur fatale: {e}")
+        logger.error("❌ Erreur fatale: {}", e)
         st.error(f"❌ Erreur: {e}")
         st.stop()
\ No newline at end of file
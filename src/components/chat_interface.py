@@ -3,32 +3,113 @@ Interface de chat avec design de la maquette - VERSION CORRIGÉE v3
 Cabinet Parenti - Assistant Juridique IA
 Scroll automatique UNIQUEMENT dans le conteneur de chat
 """
+import html
+import time
 import streamlit as st
-from typing import Dict, List
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
 from datetime import datetime
 from loguru import logger
 
-from src.utils.llm_handler import LLMHandler
-from src.utils.vector_store import VectorStoreManager
-from src.utils.conversation_manager import ConversationManager
+from src.config.settings import MAX_SESSION_MESSAGES, MAX_HISTORY_TURNS
+
+# Types seulement : les instances sont créées (et leurs modules importés) par app.py
+if TYPE_CHECKING:
+    from src.utils.llm_handler import LLMHandler
+    from src.utils.vector_store import VectorStoreManager
+    from src.utils.conversation_manager import ConversationManager
+
+
+# Blocs statiques, rédigés directement en HTML (aucune conversion Markdown au rendu)
+_WELCOME_HTML = """
+        <div style='text-align: center; padding: 3rem 1rem;'>
+            <div style='font-size: 4rem; margin-bottom: 1rem;'>📚</div>
+            <h2 style='color: #1e3a5f;'>Bienvenue dans votre assistant juridique</h2>
+            <p style='color: #64748b; max-width: 500px; margin: 1rem auto;'>
+                Commencez par poser une question sur vos documents juridiques.
+                Les réponses sont basées exclusivement sur les documents que vous avez uploadés.
+            </p>
+            <div style='margin-top: 2rem; display: flex; flex-wrap: wrap; gap: 1rem; justify-content: center; color: #D4AF37'>
+                <div style='background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%); padding: 1rem 1.5rem; border-radius: 12px; max-width: 200px;'>
+                    <div style='font-size: 1.5rem; margin-bottom: 0.5rem;'>🔍</div>
+                    <strong>Recherche contextuelle</strong>
+                    <p style='font-size: 0.85rem; margin: 0.5rem 0 0 0;'>Réponses basées sur vos documents</p>
+                </div>
+                <div style='background: linear-gradient(135deg, #f3e5f5 0%, #e1bee7 100%); padding: 1rem 1.5rem; border-radius: 12px; max-width: 200px;'>
+                    <div style='font-size: 1.5rem; margin-bottom: 0.5rem;'>🔒</div>
+                    <strong>Totalement sécurisé</strong>
+                    <p style='font-size: 0.85rem; margin: 0.5rem 0 0 0;'>Vos données restent privées</p>
+                </div>
+                <div style='background: linear-gradient(135deg, #e8f5e9 0%, #c8e6c9 100%); padding: 1rem 1.5rem; border-radius: 12px; max-width: 200px;'>
+                    <div style='font-size: 1.5rem; margin-bottom: 0.5rem;'>⚡</div>
+                    <strong>Réponses rapides</strong>
+                    <p style='font-size: 0.85rem; margin: 0.5rem 0 0 0;'>IA optimisée pour le juridique</p>
+                </div>
+            </div>
+        </div>
+    """
+
+# Gabarits des bulles de messages (remplis par _render_bubble)
+_USER_BUBBLE_HTML = (
+    '<div class="message-container user-message">'
+    '<div class="message-bubble user-bubble">'
+    '<div class="message-header">👤 Vous</div>'
+    '<div class="message-content">{content}</div>'
+    '<div class="message-time">{timestamp}</div>'
+    '</div></div>'
+)
+
+_ASSISTANT_BUBBLE_HTML = (
+    '<div class="message-container assistant-message">'
+    '<div class="message-bubble assistant-bubble">'
+    '<div class="message-header">🤖 Assistant</div>'
+    '<div class="message-content">{content}{sources_html}</div>'
+    '<div class="message-time">{timestamp}</div>'
+    '</div></div>'
+)
+
+_CHAT_BOTTOM_ANCHOR_HTML = '<div id="chat-bottom-anchor" style="height: 1px;"></div>'
+
+_SOURCES_HEADER_HTML = "<br><br><strong style='font-size: 0.9rem;'>📚 Sources:</strong><br>"
+_SOURCE_ITEM_HTML = "<span style='font-size: 0.85rem;'>• {}</span>"
+
+# Nombre de messages archivés d'un coup quand l'historique en session dépasse la limite
+ARCHIVE_BATCH_SIZE = 10
+# Messages archivés affichés en plus à chaque clic sur « Afficher les messages précédents »
+ARCHIVE_PAGE_SIZE = 20
+# Rafraîchissement de la bulle en streaming : au moins N caractères nouveaux et N secondes d'écart
+STREAM_RENDER_MIN_CHARS = 16
+STREAM_RENDER_INTERVAL_SECONDS = 0.05
+
+_TIPS_HTML = """
+<p><strong>Posez des questions:</strong></p>
+<ul>
+    <li>✅ Précises et contextualisées</li>
+    <li>✅ En rapport avec vos documents</li>
+    <li>✅ Une question à la fois</li>
+</ul>
+<p><strong>Exemples:</strong></p>
+<ul>
+    <li>"Quelles sont les conditions de résiliation ?"</li>
+    <li>"Résume les obligations du locataire"</li>
+    <li>"Quelle est la durée du préavis ?"</li>
+</ul>
+"""
 
 
 def render_chat_interface(
-    llm_handler: LLMHandler,
-    vector_store_manager: VectorStoreManager,
-    conversation_manager: ConversationManager
+    llm_handler: "LLMHandler",
+    vector_store_manager: "VectorStoreManager",
+    conversation_manager: "ConversationManager"
 ):
     """Render l'interface de chat (Page 1) avec le design de la maquette"""
     
     # Initialiser la conversation si nécessaire
-    if "current_conversation_id" not in st.session_state:
-        st.session_state.current_conversation_id = conversation_manager.generate_conversation_id()
-    
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    
-    if "feedback" not in st.session_state:
-        st.session_state.feedback = {}
+    _init_session_state(
+        current_conversation_id=conversation_manager.generate_conversation_id,
+        chat_history=list,
+        archived_count=int,
+        feedback=dict
+    )
     
     # Layout principal: Chat + Info panel
     col_chat, col_info = st.columns([3, 1])
@@ -40,12 +121,31 @@ def render_chat_interface(
         _render_info_panel(vector_store_manager)
 
 
+def _init_session_state(**factories: Callable[[], Any]):
+    """
+    Initialise les clés absentes de la session
+    
+    Args:
+        factories: Fabrique de la valeur initiale par clé (appelée seulement si la clé manque)
+    """
+    session_state = st.session_state
+    for key, factory in factories.items():
+        if key not in session_state:
+            session_state[key] = factory()
+
+
+@st.fragment
 def _render_chat_area(
-    llm_handler: LLMHandler,
-    vector_store_manager: VectorStoreManager,
-    conversation_manager: ConversationManager
+    llm_handler: "LLMHandler",
+    vector_store_manager: "VectorStoreManager",
+    conversation_manager: "ConversationManager"
 ):
-    """Zone de chat principale"""
+    """
+    Zone de chat principale
+    
+    Rendue comme fragment : l'envoi d'un message ne ré-exécute que cette zone
+    (ni la sidebar, ni le panneau d'informations, ni l'injection du CSS).
+    """
     
     st.markdown("### 🗨️ Conversation")
     
@@ -56,182 +156,200 @@ def _render_chat_area(
         if not st.session_state.chat_history:
             _render_welcome_message()
         else:
+            if st.session_state.archived_count:
+                _render_archived_messages(conversation_manager)
             _render_messages(st.session_state.chat_history)
-            # Ajouter un élément vide à la toute fin pour forcer le scroll
-            st.markdown('<div id="chat-bottom-anchor" style="height: 1px;"></div>', unsafe_allow_html=True)
     
     # Espaceur
     st.markdown("<div style='margin-top: 1rem;'></div>", unsafe_allow_html=True)
     
     # Zone de saisie FIXÉE en bas
-    _render_input_area(llm_handler, vector_store_manager, conversation_manager)
+    _render_input_area(llm_handler, vector_store_manager, conversation_manager, chat_container)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _get_cached_sources(_vector_store_manager: "VectorStoreManager", version: int) -> List[str]:
+    """
+    Cache la liste des sources de la base vectorielle
+    
+    Args:
+        _vector_store_manager: Gestionnaire de la base (non haché)
+        version: Version courante de la base (clé de cache)
+        
+    Returns:
+        Liste triée des noms de fichiers sources
+    """
+    return _vector_store_manager.get_all_sources()
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _get_cached_document_count(_vector_store_manager: "VectorStoreManager", version: int) -> int:
+    """
+    Cache le nombre de chunks de la base vectorielle
+    
+    Args:
+        _vector_store_manager: Gestionnaire de la base (non haché)
+        version: Version courante de la base (clé de cache)
+        
+    Returns:
+        Nombre de chunks (0 si base vide)
+    """
+    return _vector_store_manager.get_document_count()
 
 
 def _render_welcome_message():
     """Message de bienvenue"""
-    st.markdown("""
-        <div style='text-align: center; padding: 3rem 1rem;'>
-            <div style='font-size: 4rem; margin-bottom: 1rem;'>📚</div>
-            <h2 style='color: #1e3a5f;'>Bienvenue dans votre assistant juridique</h2>
-            <p style='color: #64748b; max-width: 500px; margin: 1rem auto;'>
-                Commencez par poser une question sur vos documents juridiques.
-                Les réponses sont basées exclusivement sur les documents que vous avez uploadés.
-            </p>
-            <div style='margin-top: 2rem; display: flex; flex-wrap: wrap; gap: 1rem; justify-content: center; color: #D4AF37'>
-                <div style='background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%); padding: 1rem 1.5rem; border-radius: 12px; max-width: 200px;'>
-                    <div style='font-size: 1.5rem; margin-bottom: 0.5rem;'>🔍</div>
-                    <strong>Recherche contextuelle</strong>
-                    <p style='font-size: 0.85rem; margin: 0.5rem 0 0 0;'>Réponses basées sur vos documents</p>
-                </div>
-                <div style='background: linear-gradient(135deg, #f3e5f5 0%, #e1bee7 100%); padding: 1rem 1.5rem; border-radius: 12px; max-width: 200px;'>
-                    <div style='font-size: 1.5rem; margin-bottom: 0.5rem;'>🔒</div>
-                    <strong>Totalement sécurisé</strong>
-                    <p style='font-size: 0.85rem; margin: 0.5rem 0 0 0;'>Vos données restent privées</p>
-                </div>
-                <div style='background: linear-gradient(135deg, #e8f5e9 0%, #c8e6c9 100%); padding: 1rem 1.5rem; border-radius: 12px; max-width: 200px;'>
-                    <div style='font-size: 1.5rem; margin-bottom: 0.5rem;'>⚡</div>
-                    <strong>Réponses rapides</strong>
-                    <p style='font-size: 0.85rem; margin: 0.5rem 0 0 0;'>IA optimisée pour le juridique</p>
-                </div>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_WELCOME_HTML, unsafe_allow_html=True)
+
+
+def _render_bubble(msg: Dict) -> str:
+    """
+    Construit le HTML de la bulle d'un message
+    
+    Args:
+        msg: Message (role, content, timestamp, sources éventuelles)
+        
+    Returns:
+        HTML de la bulle
+    """
+    # Contenu échappé ; les retours à la ligne deviennent des <br> pour que
+    # le bloc HTML ne soit pas coupé par une ligne vide
+    content = html.escape(msg["content"]).replace("\n", "<br>")
+    timestamp = msg.get("timestamp", "")
+    
+    if msg["role"] == "user":
+        # Message utilisateur (à droite, bleu)
+        return _USER_BUBBLE_HTML.format(content=content, timestamp=timestamp)
+    
+    # Message assistant (à gauche, gris)
+    sources = msg.get("sources", [])
+    sources_html = ""
+    if sources:
+        sources_html = _SOURCES_HEADER_HTML + "<br>".join(
+            _SOURCE_ITEM_HTML.format(html.escape(source)) for source in sources
+        )
+    
+    return _ASSISTANT_BUBBLE_HTML.format(content=content, sources_html=sources_html, timestamp=timestamp)
+
+
+def _render_archived_messages(conversation_manager: "ConversationManager"):
+    """
+    Messages plus anciens que la fenêtre gardée en session, chargés à la demande
+    
+    Args:
+        conversation_manager: Gestionnaire des conversations (lecture du journal)
+    """
+    conversation_id = st.session_state.current_conversation_id
+    archived_count = st.session_state.archived_count
+    
+    # Messages archivés affichés (les plus récents d'abord), par pages de ARCHIVE_PAGE_SIZE
+    shown_for, shown = st.session_state.get("archived_shown", (None, 0))
+    shown = min(shown, archived_count) if shown_for == conversation_id else 0
+    
+    if shown < archived_count:
+        st.button(
+            f"🗄️ Afficher les messages précédents ({archived_count - shown})",
+            key="show_archived",
+            use_container_width=True,
+            on_click=_show_more_archived,
+            args=(conversation_id, shown)
+        )
+    
+    if shown:
+        # HTML gardé en session : le journal n'est relu que si la plage affichée change
+        # (archived_count fait partie de la clé : il augmente quand la session est tronquée)
+        key = (conversation_id, archived_count, shown)
+        rendered_key, archived_html = st.session_state.get("_rendered_archived", (None, ""))
+        if rendered_key != key:
+            archived = conversation_manager.load_archived_messages(
+                conversation_id, archived_count, start=archived_count - shown
+            )
+            archived_html = "".join(_render_bubble(msg) for msg in archived)
+            st.session_state._rendered_archived = (key, archived_html)
+        st.markdown(archived_html, unsafe_allow_html=True)
+
+
+def _show_more_archived(conversation_id: str, shown: int):
+    """Callback : affiche une page de plus de messages archivés de la conversation courante"""
+    st.session_state.archived_shown = (conversation_id, shown + ARCHIVE_PAGE_SIZE)
 
 
 def _render_messages(messages: List[Dict]):
-    """Affiche les messages sous forme de bulles avec feedback"""
-    for idx, msg in enumerate(messages):
-        role = msg["role"]
-        content = msg["content"]
-        timestamp = msg.get("timestamp", "")
-        msg_id = msg.get("id", f"{role}_{idx}")
-        is_last = (idx == len(messages) - 1)
-        last_msg_id = 'id="last-message"' if is_last else ''
+    """Affiche les messages sous forme de bulles (un seul bloc HTML pour tout l'historique)"""
+    # Clé (id, empreinte du contenu) : un message modifié sous le même id est reformaté
+    keys = [
+        (msg.get("id"), hash((msg["role"], msg["content"], msg.get("timestamp", ""))))
+        for msg in messages
+    ]
+    
+    # Bloc HTML de l'historique déjà affiché : réutilisé tel quel, ou complété
+    # par les seuls messages ajoutés depuis
+    previous_keys, history_html = st.session_state.get("_rendered_history", ([], ""))
+    if keys != previous_keys:
+        start = len(previous_keys)
+        if keys[:start] != previous_keys:
+            start, history_html = 0, ""
+        history_html += "".join(_render_cached_bubble(msg, key) for msg, key in zip(messages[start:], keys[start:]))
+        st.session_state._rendered_history = (keys, history_html)
         
-        if role == "user":
-            # Message utilisateur (à droite, bleu)
-            st.markdown(f"""
-                <div class="message-container user-message" {last_msg_id}>
-                    <div class="message-bubble user-bubble">
-                        <div class="message-header">👤 Vous</div>
-                        <div class="message-content">{content}</div>
-                        <div class="message-time">{timestamp}</div>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
-        else:
-            # Message assistant (à gauche, gris)
-            sources = msg.get("sources", [])
-            sources_html = ""
-            if sources:
-                sources_html = "<br><br><strong style='font-size: 0.9rem;'>📚 Sources:</strong><br>"
-                sources_html += "<br>".join([f"<span style='font-size: 0.85rem;'>• {s}</span>" for s in sources])
-            
-            st.markdown(f"""
-                <div class="message-container assistant-message" {last_msg_id}>
-                    <div class="message-bubble assistant-bubble">
-                        <div class="message-header">🤖 Assistant</div>
-                        <div class="message-content">{content}{sources_html}</div>
-                        <div class="message-time">{timestamp}</div>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
-            
+        # Oublier les messages qui ne sont plus affichés (autre conversation, historique tronqué)
+        rendered = st.session_state.get("_rendered_cache", {})
+        if len(rendered) > 2 * len(keys):
+            st.session_state._rendered_cache = {key: rendered[key] for key in keys}
     
-    # Script CORRIGÉ - Scroll UNIQUEMENT le conteneur de chat (pas toute la page)
+    # Élément vide à la toute fin (cible du scroll), dans le même bloc HTML
+    st.markdown(history_html + _CHAT_BOTTOM_ANCHOR_HTML, unsafe_allow_html=True)
+    
+    # Un seul scroll par rerun (l'ancre est réémise à chaque rerun) ; seul le
+    # conteneur de chat défile, pas toute la page (d'où pas de scrollIntoView)
     st.components.v1.html("""
         <script>
-        (function() {
-            function scrollChatToBottom() {
-                try {
-                    const parentDoc = window.parent.document;
-                    
-                    // Trouver l'ancre de fin du chat
-                    const anchor = parentDoc.getElementById('chat-bottom-anchor');
-                    if (!anchor) {
-                        console.log('Ancre non trouvée');
-                        return;
-                    }
-                    
-                    // Chercher le conteneur scrollable parent (le conteneur avec height=450)
-                    let scrollContainer = anchor.parentElement;
-                    let found = false;
-                    
-                    // Remonter dans le DOM pour trouver le bon conteneur
-                    while (scrollContainer && scrollContainer !== parentDoc.body) {
-                        const hasScroll = scrollContainer.scrollHeight > scrollContainer.clientHeight;
-                        const hasOverflow = window.getComputedStyle(scrollContainer).overflowY !== 'visible';
-                        
-                        // C'est le bon conteneur si il a du scroll
-                        if (hasScroll && hasOverflow) {
-                            scrollContainer.scrollTop = scrollContainer.scrollHeight;
-                            found = true;
-                            break;
-                        }
-                        
-                        scrollContainer = scrollContainer.parentElement;
-                    }
-                    
-                    if (!found) {
-                        console.log('Conteneur scrollable non trouvé');
-                    }
-                    
-                } catch(e) {
-                    console.log('Erreur scroll:', e);
+        requestAnimationFrame(() => {
+            const anchor = window.parent.document.getElementById('chat-bottom-anchor');
+            let container = anchor && anchor.parentElement;
+            while (container && container !== window.parent.document.body) {
+                if (container.scrollHeight > container.clientHeight
+                        && window.parent.getComputedStyle(container).overflowY !== 'visible') {
+                    break;
                 }
+                container = container.parentElement;
             }
-            
-            // Exécuter plusieurs fois pour s'assurer que ça fonctionne
-            scrollChatToBottom();
-            setTimeout(scrollChatToBottom, 100);
-            setTimeout(scrollChatToBottom, 300);
-            setTimeout(scrollChatToBottom, 600);
-            setTimeout(scrollChatToBottom, 1000);
-            
-            // Observer uniquement les changements dans la zone de chat
-            try {
-                const parentDoc = window.parent.document;
-                const anchor = parentDoc.getElementById('chat-bottom-anchor');
-                
-                if (anchor && anchor.parentElement) {
-                    const observer = new MutationObserver(() => {
-                        setTimeout(scrollChatToBottom, 100);
-                    });
-                    
-                    // Observer uniquement le conteneur parent de l'ancre
-                    let observeTarget = anchor.parentElement;
-                    while (observeTarget && observeTarget.scrollHeight <= observeTarget.clientHeight) {
-                        observeTarget = observeTarget.parentElement;
-                        if (observeTarget === parentDoc.body) break;
-                    }
-                    
-                    if (observeTarget && observeTarget !== parentDoc.body) {
-                        observer.observe(observeTarget, { 
-                            childList: true, 
-                            subtree: true 
-                        });
-                        
-                        // Arrêter après 2 secondes
-                        setTimeout(() => observer.disconnect(), 2000);
-                    }
-                }
-            } catch(e) {
-                console.log('Erreur observer:', e);
+            if (container && container !== window.parent.document.body) {
+                container.scrollTop = container.scrollHeight;
             }
-        })();
+        });
         </script>
     """, height=0)
 
 
+def _render_cached_bubble(msg: Dict, key: tuple) -> str:
+    """
+    HTML de la bulle d'un message, formaté une seule fois par session
+    
+    Args:
+        msg: Message à afficher
+        key: Clé du message (id, empreinte du contenu)
+        
+    Returns:
+        HTML de la bulle
+    """
+    rendered = st.session_state.setdefault("_rendered_cache", {})
+    bubble = rendered.get(key)
+    if bubble is None:
+        bubble = rendered[key] = _render_bubble(msg)
+    return bubble
+
+
 def _render_input_area(
-    llm_handler: LLMHandler,
-    vector_store_manager: VectorStoreManager,
-    conversation_manager: ConversationManager
+    llm_handler: "LLMHandler",
+    vector_store_manager: "VectorStoreManager",
+    conversation_manager: "ConversationManager",
+    chat_container
 ):
     """Zone de saisie optimisée"""
     
     # Vérifier si des documents sont chargés
-    doc_count = vector_store_manager.get_document_count()
+    doc_count = _get_cached_document_count(vector_store_manager, vector_store_manager.version)
     
     if doc_count == 0:
         st.warning("⚠️ Aucun document chargé. Allez dans 'Gestion Documents' pour uploader des fichiers.", icon="⚠️")
@@ -241,34 +359,35 @@ def _render_input_area(
     input_container = st.container()
     
     with input_container:
-        # Créer un formulaire pour la touche Entrée
-        with st.form(key="chat_form", clear_on_submit=True):
-            col1, col2 = st.columns([9, 1])
-        
-            with col1:
-                user_input = st.text_input(
-                    "Message",
-                    placeholder="💬 Posez votre question juridique... (Appuyez sur Entrée pour envoyer)",
-                    key="user_input_field",
-                    label_visibility="collapsed"
-                )
-            
-            with col2:
-                send_button = st.form_submit_button("➤", use_container_width=True, type="primary")
+        # Champ de chat natif : envoi par Entrée, vidé automatiquement après l'envoi
+        user_input = st.chat_input(
+            "💬 Posez votre question juridique... (Appuyez sur Entrée pour envoyer)",
+            key="user_input_field"
+        )
         
-        # Traiter l'envoi (Entrée ou bouton)
-        if send_button and user_input.strip():
-            _handle_user_message(user_input, llm_handler, vector_store_manager, conversation_manager)
-            st.rerun()
+        # Traiter l'envoi
+        if user_input and user_input.strip():
+            # Premier échange : toute l'application est redessinée (la sidebar doit
+            # lister la nouvelle conversation) ; sinon la réponse est déjà affichée
+            first_exchange = not st.session_state.chat_history
+            _handle_user_message(user_input, llm_handler, vector_store_manager, conversation_manager, chat_container)
+            if first_exchange and st.session_state.chat_history:
+                st.rerun(scope="app")
 
 
 def _handle_user_message(
     user_input: str,
-    llm_handler: LLMHandler,
-    vector_store_manager: VectorStoreManager,
-    conversation_manager: ConversationManager
+    llm_handler: "LLMHandler",
+    vector_store_manager: "VectorStoreManager",
+    conversation_manager: "ConversationManager",
+    chat_container
 ):
-    """Traite le message utilisateur avec gestion d'erreurs améliorée"""
+    """
+    Traite le message utilisateur avec gestion d'erreurs améliorée
+    
+    La question puis la réponse (en streaming) sont ajoutées directement à la
+    zone de chat, sans rerun.
+    """
     
     # Valider
     is_valid, error_msg = llm_handler.validate_question(user_input)
@@ -277,56 +396,71 @@ def _handle_user_message(
         return
     
     # Ajouter le message utilisateur
-    timestamp = datetime.now().strftime("%H:%M")
-    msg_id = f"user_{datetime.now().timestamp()}"
+    now = datetime.now()
     user_message = {
         "role": "user",
         "content": user_input,
-        "timestamp": timestamp,
-        "id": msg_id
+        "timestamp": _format_hm(now),
+        "id": f"user_{now.timestamp()}"
     }
     st.session_state.chat_history.append(user_message)
+    # Ajout au journal de la conversation (écriture différée et regroupée avec la réponse)
+    conversation_manager.append_messages(st.session_state.current_conversation_id, [user_message])
+    chat_container.markdown(_render_bubble(user_message), unsafe_allow_html=True)
     
     # Générer la réponse avec LOADING STATES améliorés
     try:
         with st.status("🔍 Traitement de votre question...", expanded=True) as status:
             st.write("📄 Recherche dans les documents...")
             
-            # Simuler les étapes (vous pouvez adapter selon votre LLMHandler)
-            import time
-            time.sleep(0.5)
-            
-            st.write("🧠 Analyse contextuelle...")
-            time.sleep(0.5)
-            
-            st.write("✍️ Génération de la réponse...")
-            
-            response = llm_handler.generate_response(
+            # Seuls les derniers échanges sont envoyés au LLM, sans la question
+            # courante (déjà dans le prompt) ; la recherche est faite ici,
+            # la génération au fil du stream
+            token_stream, sources = llm_handler.stream_response(
                 question=user_input,
-                chat_history=st.session_state.chat_history
+                chat_history=st.session_state.chat_history[-(2 * MAX_HISTORY_TURNS + 1):-1]
             )
             
-            st.write("✅ Réponse prête !")
-            status.update(label="✅ Réponse générée avec succès !", state="complete")
+            st.write("🧠 Analyse contextuelle...")
+            st.write("✍️ Génération de la réponse...")
+            status.update(label="✅ Documents analysés, réponse en cours...", state="complete", expanded=False)
+        
+        # Afficher la réponse au fil de la génération
+        # (rafraîchissements limités : chaque markdown est un envoi au navigateur)
+        placeholder = chat_container.empty()
+        chunks = []
+        received = 0
+        last_emit_len = 0
+        last_emit_time = time.monotonic()
+        for token in token_stream:
+            chunks.append(token)
+            received += len(token)
+            now_mono = time.monotonic()
+            if (received - last_emit_len >= STREAM_RENDER_MIN_CHARS
+                    and now_mono - last_emit_time >= STREAM_RENDER_INTERVAL_SECONDS):
+                placeholder.markdown(
+                    _render_bubble({"role": "assistant", "content": "".join(chunks)}),
+                    unsafe_allow_html=True
+                )
+                last_emit_len = received
+                last_emit_time = now_mono
+        answer = "".join(chunks)
         
         # Ajouter la réponse
-        assistant_msg_id = f"assistant_{datetime.now().timestamp()}"
+        now = datetime.now()
         assistant_message = {
             "role": "assistant",
-            "content": response["answer"],
-            "timestamp": datetime.now().strftime("%H:%M"),
-            "sources": response.get("sources", []),
-            "id": assistant_msg_id
+            "content": answer,
+            "timestamp": _format_hm(now),
+            "sources": sources,
+            "id": f"assistant_{now.timestamp()}"
         }
+        placeholder.markdown(_render_bubble(assistant_message), unsafe_allow_html=True)
         st.session_state.chat_history.append(assistant_message)
+        conversation_manager.append_messages(st.session_state.current_conversation_id, [assistant_message])
+        _trim_chat_history()
         
-        # Sauvegarder
-        conversation_manager.save_conversation(
-            st.session_state.current_conversation_id,
-            st.session_state.chat_history
-        )
-        
-        logger.info(f"✅ Réponse générée pour: {user_input[:50]}...")
+        logger.info("✅ Réponse générée pour: {}...", user_input[:50])
         
     except Exception as e:
         error_type = type(e).__name__
@@ -349,10 +483,10 @@ def _handle_user_message(
             st.markdown("- Essayez de reformuler votre question")
             st.markdown("- Contactez l'administrateur si le problème persiste")
         
-        logger.error(f"❌ Erreur lors de la génération: {error_type} - {str(e)}")
+        logger.error("❌ Erreur lors de la génération: {} - {}", error_type, e)
 
 
-def _render_info_panel(vector_store_manager: VectorStoreManager):
+def _render_info_panel(vector_store_manager: "VectorStoreManager"):
     """Panneau d'informations amélioré"""
     
     # Informations RAG
@@ -367,17 +501,12 @@ def _render_info_panel(vector_store_manager: VectorStoreManager):
     """, unsafe_allow_html=True)
     
     # Documents sources avec stats
-    sources = vector_store_manager.get_all_sources()
-    doc_count = len(sources)
-    
-    # Calculer les types de documents
-    doc_types = {}
-    for source in sources:
-        ext = source.split('.')[-1].lower()
-        doc_types[ext] = doc_types.get(ext, 0) + 1
-    
-    types_html = "<br>".join([f"<span style='font-size: 0.85rem;'>• {ext.upper()}: {count}</span>" 
-                               for ext, count in doc_types.items()])
+    # (base vide : le nombre de chunks, déjà lu par la zone de saisie, suffit)
+    version = vector_store_manager.version
+    if _get_cached_document_count(vector_store_manager, version):
+        doc_count = len(_get_cached_sources(vector_store_manager, version))
+    else:
+        doc_count = 0
     
     st.markdown(f"""
         <div class="info-panel">
@@ -397,14 +526,28 @@ def _render_info_panel(vector_store_manager: VectorStoreManager):
     
     # Tips pour meilleures questions
     with st.expander("💡 Conseils pour de meilleures réponses"):
-        st.markdown("""
-        **Posez des questions:**
-        - ✅ Précises et contextualisées
-        - ✅ En rapport avec vos documents
-        - ✅ Une question à la fois
-        
-        **Exemples:**
-        - "Quelles sont les conditions de résiliation ?"
-        - "Résume les obligations du locataire"
-        - "Quelle est la durée du préavis ?"
-        """)
\ No newline at end of file
+        st.markdown(_TIPS_HTML, unsafe_allow_html=True)
+
+
+def _format_hm(dt: datetime) -> str:
+    """Heure d'un message au format HH:MM (sans passer par strftime)"""
+    return f"{dt.hour:02d}:{dt.minute:02d}"
+
+
+def _trim_chat_history():
+    """
+    Borne la taille de l'historique gardé en session
+    
+    Au-delà de MAX_SESSION_MESSAGES, les plus anciens messages sont retirés de
+    la session par lots de ARCHIVE_BATCH_SIZE (ils restent dans le journal
+    de la conversation sur disque).
+    """
+    history = st.session_state.chat_history
+    if len(history) <= MAX_SESSION_MESSAGES:
+        return
+    
+    overflow = len(history) - MAX_SESSION_MESSAGES
+    batch = max(ARCHIVE_BATCH_SIZE, overflow)
+    
+    del history[:batch]
+    st.session_state.archived_count += batch
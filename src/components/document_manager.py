@@ -4,14 +4,17 @@ Cabinet Parenti - Assistant Juridique IA
 """
 import streamlit as st
 from pathlib import Path
-from typing import List
+from typing import List, TYPE_CHECKING
 from loguru import logger
 from datetime import datetime
 
-from src.utils.vector_store import VectorStoreManager
-from src.utils.document_processor import DocumentProcessor
 from src.config.settings import UPLOAD_DIR, SUPPORTED_EXTENSIONS
 
+# Utilisés uniquement pour les annotations : les instances sont fournies par app.py
+if TYPE_CHECKING:
+    from src.utils.vector_store import VectorStoreManager
+    from src.utils.document_processor import DocumentProcessor
+
 
 @st.cache_data(ttl=300)
 def get_document_stats(sources: List[str]) -> dict:
@@ -35,8 +38,8 @@ def get_document_stats(sources: List[str]) -> dict:
 
 
 def render_document_manager(
-    vector_store_manager: VectorStoreManager,
-    document_processor: DocumentProcessor
+    vector_store_manager: "VectorStoreManager",
+    document_processor: "DocumentProcessor"
 ):
     """Render la page de gestion des documents (Page 2) avec design maquette"""
     
@@ -58,8 +61,8 @@ def render_document_manager(
     
 
 def _render_upload_section(
-    vector_store_manager: VectorStoreManager,
-    document_processor: DocumentProcessor
+    vector_store_manager: "VectorStoreManager",
+    document_processor: "DocumentProcessor"
 ):
     """Section upload avec design maquette et glisser-déposer"""
     
@@ -83,7 +86,7 @@ def _render_upload_section(
         "Sélectionnez vos fichiers",
         type=[ext.replace(".", "") for ext in SUPPORTED_EXTENSIONS],
         accept_multiple_files=True,
-        key="file_uploader",
+        key=f"file_uploader_{st.session_state.get('uploader_generation', 0)}",
         label_visibility="collapsed"
     )
     
@@ -103,11 +106,21 @@ def _render_upload_section(
                 _handle_upload(uploaded_files, vector_store_manager, document_processor)
         
         with col2:
-            if st.button("🗑️ Annuler", use_container_width=True):
-                st.rerun()
+            # Nouvelle clé pour l'uploader : la sélection est vidée au rerun du clic
+            st.button("🗑️ Annuler", use_container_width=True, on_click=_reset_uploader)
+
+
+def _reset_uploader():
+    """Callback : vide l'uploader en changeant sa clé"""
+    st.session_state.uploader_generation = st.session_state.get("uploader_generation", 0) + 1
 
 
-def _render_stats_card(vector_store_manager: VectorStoreManager):
+def _set_confirm_delete_all(value: bool):
+    """Callback : affiche ou masque la confirmation de suppression totale"""
+    st.session_state.confirm_delete_all = value
+
+
+def _render_stats_card(vector_store_manager: "VectorStoreManager"):
     """Carte de statistiques améliorée avec cache"""
     
     sources = vector_store_manager.get_all_sources()
@@ -150,8 +163,8 @@ def _render_stats_card(vector_store_manager: VectorStoreManager):
 
 def _handle_upload(
     uploaded_files,
-    vector_store_manager: VectorStoreManager,
-    document_processor: DocumentProcessor
+    vector_store_manager: "VectorStoreManager",
+    document_processor: "DocumentProcessor"
 ):
     """Gère l'upload avec gestion d'erreurs améliorée"""
     
@@ -231,7 +244,7 @@ def _handle_upload(
         st.rerun()
 
 
-def _render_documents_list(vector_store_manager: VectorStoreManager):
+def _render_documents_list(vector_store_manager: "VectorStoreManager"):
     """Affiche la liste des documents avec filtres améliorés"""
     
     sources = vector_store_manager.get_all_sources()
@@ -303,9 +316,8 @@ def _render_documents_list(vector_store_manager: VectorStoreManager):
     col1, col2, col3 = st.columns([1, 1, 1])
     
     with col2:
-        if st.button("🔄 Rafraîchir la liste", use_container_width=True):
-            get_document_stats.clear()
-            st.rerun()
+        st.button("🔄 Rafraîchir la liste", use_container_width=True,
+                  on_click=get_document_stats.clear)
     
     # Bouton supprimer tout (avec confirmation)
     if sources:
@@ -317,19 +329,17 @@ def _render_documents_list(vector_store_manager: VectorStoreManager):
                            unsafe_allow_html=True)
                 col_yes, col_no = st.columns(2)
                 with col_yes:
-                    if st.button("✅ Oui", use_container_width=True, type="primary"):
-                        _delete_all_documents(vector_store_manager)
+                    st.button("✅ Oui", use_container_width=True, type="primary",
+                              on_click=_delete_all_documents, args=(vector_store_manager,))
                 with col_no:
-                    if st.button("❌ Non", use_container_width=True):
-                        st.session_state.confirm_delete_all = False
-                        st.rerun()
+                    st.button("❌ Non", use_container_width=True,
+                              on_click=_set_confirm_delete_all, args=(False,))
             else:
-                if st.button("🗑️ Tout supprimer", use_container_width=True, key="delete_all"):
-                    st.session_state.confirm_delete_all = True
-                    st.rerun()
+                st.button("🗑️ Tout supprimer", use_container_width=True, key="delete_all",
+                          on_click=_set_confirm_delete_all, args=(True,))
 
 
-def _render_document_card(source: str, vector_store_manager: VectorStoreManager):
+def _render_document_card(source: str, vector_store_manager: "VectorStoreManager"):
     """Affiche une card pour un document avec infos améliorées"""
     
     # Extension et icône
@@ -369,8 +379,8 @@ def _render_document_card(source: str, vector_store_manager: VectorStoreManager)
             _preview_document(source)
     
     with col_delete:
-        if st.button("🗑️", key=f"del_{source}", use_container_width=True, help="Supprimer"):
-            _delete_document(source, vector_store_manager)
+        st.button("🗑️", key=f"del_{source}", use_container_width=True, help="Supprimer",
+                  on_click=_delete_document, args=(source, vector_store_manager))
 
 
 def _preview_document(source: str):
@@ -397,54 +407,55 @@ def _preview_document(source: str):
             st.error(f"❌ Impossible de prévisualiser: {str(e)}")
 
 
-def _delete_document(source: str, vector_store_manager: VectorStoreManager):
-    """Supprime un document avec confirmation"""
+def _delete_document(source: str, vector_store_manager: "VectorStoreManager"):
+    """
+    Callback : supprime un document
+    
+    Exécuté avant le rerun déclenché par le clic : la page est redessinée
+    sans le document, sans st.rerun() supplémentaire.
+    """
     try:
-        with st.spinner(f"🗑️ Suppression de {source}..."):
-            # Supprimer de la base vectorielle avec la bonne méthode
-            success = vector_store_manager.delete_by_source(source)
+        # Supprimer de la base vectorielle avec la bonne méthode
+        success = vector_store_manager.delete_by_source(source)
+        
+        if success:
+            # Supprimer le fichier physique
+            file_path = UPLOAD_DIR / source
+            if file_path.exists():
+                file_path.unlink()
             
-            if success:
-                # Supprimer le fichier physique
-                file_path = UPLOAD_DIR / source
-                if file_path.exists():
-                    file_path.unlink()
-                
-                st.success(f"✅ {source} supprimé!")
-                logger.info(f"🗑️ Document supprimé: {source}")
-                
-                # Invalider le cache
-                get_document_stats.clear()
-                st.rerun()
-            else:
-                st.error(f"❌ Impossible de supprimer {source}")
+            st.toast(f"✅ {source} supprimé!")
+            logger.info(f"🗑️ Document supprimé: {source}")
+            
+            # Invalider le cache
+            get_document_stats.clear()
+        else:
+            st.toast(f"❌ Impossible de supprimer {source}")
     
     except Exception as e:
         logger.error(f"❌ Erreur suppression: {e}")
-        st.error(f"❌ Erreur: {str(e)}")
+        st.toast(f"❌ Erreur: {str(e)}")
 
 
-def _delete_all_documents(vector_store_manager: VectorStoreManager):
-    """Supprime tous les documents"""
+def _delete_all_documents(vector_store_manager: "VectorStoreManager"):
+    """Callback : supprime tous les documents (avant le rerun déclenché par le clic)"""
     try:
-        with st.spinner("🗑️ Suppression de tous les documents..."):
-            vector_store_manager.clear()
-            
-            # Supprimer les fichiers physiques
-            deleted_count = 0
-            for file in UPLOAD_DIR.glob("*"):
-                if file.is_file():
-                    file.unlink()
-                    deleted_count += 1
-            
-            st.success(f"✅ {deleted_count} document(s) supprimé(s)!")
-            st.session_state.confirm_delete_all = False
-            logger.info(f"🗑️ Tous les documents supprimés ({deleted_count})")
-            
-            # Invalider le cache
-            get_document_stats.clear()
-            st.rerun()
+        vector_store_manager.clear()
+        
+        # Supprimer les fichiers physiques
+        deleted_count = 0
+        for file in UPLOAD_DIR.glob("*"):
+            if file.is_file():
+                file.unlink()
+                deleted_count += 1
+        
+        st.toast(f"✅ {deleted_count} document(s) supprimé(s)!")
+        st.session_state.confirm_delete_all = False
+        logger.info(f"🗑️ Tous les documents supprimés ({deleted_count})")
+        
+        # Invalider le cache
+        get_document_stats.clear()
     
     except Exception as e:
         logger.error(f"❌ Erreur suppression totale: {e}")
-        st.error(f"❌ Erreur: {str(e)}")
+        st.toast(f"❌ Erreur: {str(e)}")
@@ -23,6 +23,8 @@ EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.0"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "1000"))
+# Échanges précédents (question + réponse) envoyés au LLM avec chaque question
+MAX_HISTORY_TURNS = int(os.getenv("MAX_HISTORY_TURNS", "3"))
 
 # Configuration du chunking
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
@@ -31,15 +33,29 @@ CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
 # Configuration Vector Store
 VECTOR_STORE_TYPE = os.getenv("VECTOR_STORE_TYPE", "faiss")
 TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", "5"))
+# Similarité cosinus minimale pour réutiliser la réponse d'une question proche (cache sémantique).
+# Seuil élevé : avec les embeddings OpenAI (ada-002 surtout), deux questions différentes
+# sur le même sujet dépassent souvent 0.9
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+# Threads OpenMP utilisés par FAISS (limités pour ne pas concurrencer le serveur Streamlit)
+FAISS_NUM_THREADS = int(os.getenv("FAISS_NUM_THREADS", str(min(4, os.cpu_count() or 1))))
 
 # Configuration Application
 APP_TITLE = os.getenv("APP_TITLE", "RAG Legal Chatbot")
 APP_ICON = os.getenv("APP_ICON", "⚖️")
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
+# Messages gardés en session par conversation (les plus anciens sont archivés sur disque)
+MAX_SESSION_MESSAGES = int(os.getenv("MAX_SESSION_MESSAGES", "50"))
+
+# Configuration du logging (niveau du fichier de logs ; DEBUG pour le diagnostic)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
 # Validation
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY non définie. Créez un fichier .env avec votre clé API.")
 
+if MAX_HISTORY_TURNS < 0:
+    raise ValueError("MAX_HISTORY_TURNS doit être positif ou nul (0 = aucun historique envoyé au LLM).")
+
 # Types de fichiers supportés
 SUPPORTED_EXTENSIONS = [".txt", ".csv", ".html"]
\ No newline at end of file
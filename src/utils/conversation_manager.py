@@ -1,164 +1,416 @@
 """
 Gestionnaire de l'historique des conversations
 """
-import json
+import orjson
+import time
+import uuid
+import atexit
+import threading
+from collections import deque
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from loguru import logger
 
 from src.config.settings import DATA_DIR, CONVERSATIONS_DIR
 
 
 class ConversationManager:
-    """Gestionnaire pour sauvegarder et charger les conversations"""
+    """
+    Gestionnaire pour sauvegarder et charger les conversations
+    
+    Chaque conversation est stockée dans deux fichiers :
+    - {id}.json : métadonnées (titre, dates, nombre de messages), réécrites à chaque sauvegarde
+    - {id}.jsonl : journal des messages, un message par ligne, en ajout seul
+    """
+    
+    # Fenêtre de regroupement des écritures différées (append_messages)
+    SAVE_DEBOUNCE_SECONDS = 0.5
     
     def __init__(self):
         self.conversations_dir = CONVERSATIONS_DIR
         self.conversations_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Métadonnées des conversations, lues une seule fois puis tenues à jour
+        # par append/delete (protégées par un verrou : écritures en arrière-plan)
+        self._lock = threading.Lock()
+        self._meta_cache: Dict[str, Dict] = self._scan_conversations()
+        # Index trié (plus récentes en premier), reconstruit seulement après une modification
+        self._sorted_index: Optional[List[Dict]] = None
+        
+        # Écritures différées en attente : {id: (métadonnées, nouveaux messages)},
+        # faites par un thread dédié ; _write_lock garde l'ordre des écritures
+        self._pending_appends: Dict[str, Tuple[Dict, List[Dict]]] = {}
+        self._pending_cond = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        threading.Thread(target=self._save_worker, name="conv-save", daemon=True).start()
+        # Écrire ce qui reste en attente à l'arrêt du processus
+        atexit.register(self.flush)
         logger.info(f"✅ ConversationManager initialisé (dir: {self.conversations_dir})")
     
-    def save_conversation(
-        self, 
-        conversation_id: str, 
+    def append_messages(
+        self,
+        conversation_id: str,
         messages: List[Dict],
         title: Optional[str] = None
-    ) -> bool:
+    ):
         """
-        Sauvegarde une conversation
+        Ajoute des messages à une conversation (écriture différée et regroupée)
+        
+        Les métadonnées sont mises à jour immédiatement ; seuls les
+        nouveaux messages sont ajoutés au journal, par un thread dédié, après
+        SAVE_DEBOUNCE_SECONDS.
         
         Args:
             conversation_id: ID unique de la conversation
-            messages: Liste des messages
-            title: Titre optionnel (sinon première question)
-            
-        Returns:
-            True si succès
+            messages: Nouveaux messages (dans l'ordre)
+            title: Titre optionnel (sinon titre existant ou première question)
         """
-        try:
-            # Générer un titre si non fourni
-            if not title and messages:
-                first_user_msg = next(
-                    (msg["content"] for msg in messages if msg["role"] == "user"), 
-                    "Nouvelle conversation"
-                )
-                title = first_user_msg[:50] + ("..." if len(first_user_msg) > 50 else "")
-            
-            # Préparer les données
-            conversation_data = {
-                "id": conversation_id,
-                "title": title or "Nouvelle conversation",
-                "created_at": conversation_id.replace("conv_", "").replace("_", " "),
-                "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "message_count": len(messages),
-                "messages": messages
-            }
-            
-            # Sauvegarder dans un fichier JSON
-            file_path = self.conversations_dir / f"{conversation_id}.json"
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(conversation_data, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            previous = self._meta_cache.get(conversation_id, {})
+        
+        header = self._build_header(
+            conversation_id,
+            previous.get("message_count", 0) + len(messages),
+            title or previous.get("title"),
+            messages
+        )
+        
+        with self._lock:
+            self._index_conversation(header)
             
-            logger.info(f"💾 Conversation sauvegardée: {conversation_id} ({len(messages)} messages)")
-            return True
+            _, pending = self._pending_appends.get(conversation_id, (None, []))
+            self._pending_appends[conversation_id] = (header, pending + list(messages))
+            self._pending_cond.notify()
+    
+    def flush(self):
+        """Écrit immédiatement tous les ajouts différés en attente"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending_appends = self._pending_appends, {}
             
-        except Exception as e:
-            logger.error(f"❌ Erreur lors de la sauvegarde de la conversation: {e}")
-            return False
+            for conversation_id, (header, messages) in batch.items():
+                try:
+                    with open(self._log_path(conversation_id), "ab") as f:
+                        f.writelines(self._dump_message(msg) for msg in messages)
+                    self._write_header(header)
+                except Exception as e:
+                    logger.error(f"❌ Erreur lors de la sauvegarde de la conversation: {e}")
     
-    def load_conversation(self, conversation_id: str) -> Optional[Dict]:
+    def load_conversation(self, conversation_id: str, tail: Optional[int] = None) -> Optional[Dict]:
         """
         Charge une conversation
         
         Args:
             conversation_id: ID de la conversation
-            
+            tail: Nombre de messages les plus récents à charger (tous si None)
+        
         Returns:
-            Données de la conversation ou None
+            Données de la conversation ou None ; "archived_count" indique le
+            nombre de messages plus anciens non chargés (voir load_archived_messages)
         """
         try:
+            # Écrire d'abord un éventuel ajout en attente : le journal sur disque fait foi
+            self.flush()
             file_path = self.conversations_dir / f"{conversation_id}.json"
             
             if not file_path.exists():
                 logger.warning(f"⚠️ Conversation introuvable: {conversation_id}")
                 return None
             
-            with open(file_path, "r", encoding="utf-8") as f:
-                conversation_data = json.load(f)
+            with open(file_path, "rb") as f:
+                header = orjson.loads(f.read())
             
-            logger.info(f"📂 Conversation chargée: {conversation_id}")
-            return conversation_data
+            log_path = self._log_path(conversation_id)
+            messages = []
+            if log_path.exists() and tail is not None:
+                # Seuls les derniers messages sont décodés
+                total = 0
+                kept = deque(maxlen=tail)
+                with open(log_path, "rb") as f:
+                    for line in f:
+                        if line.strip():
+                            total += 1
+                            kept.append(line)
+                logger.info(f"📂 Conversation chargée ({len(kept)}/{total} messages): {conversation_id}")
+                return {
+                    **header,
+                    "archived_count": total - len(kept),
+                    "messages": [orjson.loads(line) for line in kept]
+                }
             
+            if log_path.exists():
+                with open(log_path, "rb") as f:
+                    messages = [orjson.loads(line) for line in f if line.strip()]
+            
+            logger.info(f"📂 Conversation chargée: {conversation_id}")
+            return {**header, "archived_count": 0, "messages": messages}
+        
         except Exception as e:
             logger.error(f"❌ Erreur lors du chargement de la conversation: {e}")
             return None
     
-    def list_conversations(self) -> List[Dict]:
+    def load_archived_messages(self, conversation_id: str, count: int, start: int = 0) -> List[Dict]:
         """
-        Liste toutes les conversations sauvegardées
+        Charge les plus anciens messages d'une conversation (non gardés en session)
+        
+        Args:
+            conversation_id: ID de la conversation
+            count: Fin (exclue) de la plage lue, en nombre de messages depuis le début du journal
+            start: Début de la plage lue (0 = premier message)
         
         Returns:
-            Liste des métadonnées des conversations (triées par date, plus récentes en premier)
+            Liste des messages (vide si aucun)
         """
+        self.flush()
+        file_path = self._log_path(conversation_id)
+        
+        if not file_path.exists():
+            return []
+        
         try:
-            conversations = []
-            
-            for file_path in self.conversations_dir.glob("conv_*.json"):
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    
-                    # Extraire uniquement les métadonnées (pas les messages)
-                    conversations.append({
-                        "id": data["id"],
-                        "title": data["title"],
-                        "created_at": data.get("created_at", ""),
-                        "updated_at": data.get("updated_at", ""),
-                        "message_count": data.get("message_count", 0)
-                    })
-                except Exception as e:
-                    logger.warning(f"⚠️ Impossible de lire {file_path.name}: {e}")
-            
-            # Trier par date de mise à jour (plus récent en premier)
-            conversations.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
-            
-            logger.info(f"📋 {len(conversations)} conversations trouvées")
-            return conversations
-            
+            with open(file_path, "rb") as f:
+                return [orjson.loads(line) for line in islice(f, start, count)]
         except Exception as e:
-            logger.error(f"❌ Erreur lors du listage des conversations: {e}")
+            logger.error(f"❌ Erreur lors du chargement des messages archivés: {e}")
             return []
     
+    def list_conversations(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Liste les conversations sauvegardées
+        
+        Args:
+            limit: Nombre maximal de conversations retournées (toutes si None)
+        
+        Returns:
+            Liste des métadonnées des conversations (triées par date, plus récentes en premier)
+        """
+        with self._lock:
+            if self._sorted_index is None:
+                # Trier par date de mise à jour (plus récent en premier)
+                self._sorted_index = sorted(
+                    self._meta_cache.values(),
+                    key=lambda x: x.get("updated_at", ""),
+                    reverse=True
+                )
+            # Copie limitée aux premières entrées de l'index (pas de copie complète)
+            conversations = self._sorted_index[:limit]
+        
+        logger.debug(f"📋 {len(conversations)} conversations trouvées")
+        return conversations
+    
     def delete_conversation(self, conversation_id: str) -> bool:
         """
         Supprime une conversation
         
         Args:
             conversation_id: ID de la conversation
-            
+        
         Returns:
             True si succès
         """
         try:
             file_path = self.conversations_dir / f"{conversation_id}.json"
             
-            if file_path.exists():
-                file_path.unlink()
+            # _write_lock : aucune écriture différée ne peut recréer le fichier pendant la suppression
+            with self._write_lock:
+                with self._lock:
+                    # Annuler un éventuel ajout différé de la conversation supprimée
+                    was_pending = self._pending_appends.pop(conversation_id, None) is not None
+                
+                existed = file_path.exists() or was_pending
+                if existed:
+                    file_path.unlink(missing_ok=True)
+                    self._log_path(conversation_id).unlink(missing_ok=True)
+            
+            if existed:
+                with self._lock:
+                    self._meta_cache.pop(conversation_id, None)
+                    self._sorted_index = None
                 logger.info(f"🗑️ Conversation supprimée: {conversation_id}")
                 return True
             else:
                 logger.warning(f"⚠️ Conversation introuvable: {conversation_id}")
                 return False
-                
+        
         except Exception as e:
             logger.error(f"❌ Erreur lors de la suppression: {e}")
             return False
     
+    def _save_worker(self):
+        """Thread d'écriture : attend un ajout, laisse passer la fenêtre de regroupement, écrit"""
+        while True:
+            with self._pending_cond:
+                while not self._pending_appends:
+                    self._pending_cond.wait()
+            
+            time.sleep(self.SAVE_DEBOUNCE_SECONDS)
+            self.flush()
+    
+    def _build_header(
+        self,
+        conversation_id: str,
+        message_count: int,
+        title: Optional[str],
+        messages: List[Dict]
+    ) -> Dict:
+        """
+        Prépare les métadonnées d'une conversation
+        
+        Args:
+            conversation_id: ID unique de la conversation
+            message_count: Nombre total de messages
+            title: Titre (sinon première question parmi messages)
+            messages: Messages servant à générer le titre si besoin
+        
+        Returns:
+            Métadonnées de la conversation (sans les messages)
+        """
+        # Générer un titre si non fourni
+        if not title and messages:
+            first_user_msg = next(
+                (msg["content"] for msg in messages if msg["role"] == "user"),
+                "Nouvelle conversation"
+            )
+            title = first_user_msg[:50] + ("..." if len(first_user_msg) > 50 else "")
+        
+        title = title or "Nouvelle conversation"
+        updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Libellés d'affichage précalculés pour la sidebar
+        return {
+            "id": conversation_id,
+            "title": title,
+            "display_title": self._make_display_title(title),
+            "tooltip": self._make_tooltip(message_count, updated_at),
+            "created_at": " ".join(conversation_id.split("_")[1:3]),
+            "updated_at": updated_at,
+            "message_count": message_count
+        }
+    
+    def _write_header(self, header: Dict):
+        """Écrit les métadonnées d'une conversation dans son fichier JSON"""
+        conversation_id = header["id"]
+        file_path = self.conversations_dir / f"{conversation_id}.json"
+        with open(file_path, "wb") as f:
+            f.write(orjson.dumps(header, option=orjson.OPT_INDENT_2))
+        
+        logger.info("💾 Conversation sauvegardée: {} ({} messages)", conversation_id, header["message_count"])
+    
+    def _log_path(self, conversation_id: str) -> Path:
+        """Chemin du journal JSONL des messages d'une conversation"""
+        return self.conversations_dir / f"{conversation_id}.jsonl"
+    
+    @staticmethod
+    def _dump_message(message: Dict) -> bytes:
+        """Sérialise un message sur une ligne du journal (UTF-8)"""
+        return orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE)
+    
+    def _index_conversation(self, header: Dict):
+        """Met à jour les métadonnées de la sidebar (appelé sous self._lock)"""
+        self._meta_cache[header["id"]] = self._extract_metadata(header)
+        self._sorted_index = None
+    
+    def _scan_conversations(self) -> Dict[str, Dict]:
+        """
+        Lit les métadonnées de toutes les conversations présentes sur disque
+        
+        Les fichiers de l'ancien format (messages inclus dans le JSON) sont
+        convertis au passage en métadonnées + journal JSONL.
+        
+        Returns:
+            Dictionnaire {conversation_id: métadonnées}
+        """
+        conversations = {}
+        
+        try:
+            for file_path in self.conversations_dir.glob("conv_*.json"):
+                try:
+                    with open(file_path, "rb") as f:
+                        data = orjson.loads(f.read())
+                    
+                    if "messages" in data:
+                        self._migrate_legacy_file(data)
+                    
+                    conversations[data["id"]] = self._extract_metadata(data)
+                except Exception as e:
+                    logger.warning(f"⚠️ Impossible de lire {file_path.name}: {e}")
+            
+            logger.info(f"📋 {len(conversations)} conversations trouvées")
+        
+        except Exception as e:
+            logger.error(f"❌ Erreur lors du listage des conversations: {e}")
+        
+        return conversations
+    
+    def _migrate_legacy_file(self, data: Dict):
+        """
+        Convertit une conversation de l'ancien format (un seul JSON avec les messages)
+        
+        Args:
+            data: Contenu du fichier JSON (modifié : la clé "messages" est retirée)
+        """
+        messages = data.pop("messages")
+        data.pop("archived_count", None)
+        data["message_count"] = len(messages)
+        data.setdefault("tooltip", self._make_tooltip(data["message_count"], data.get("updated_at", "")))
+        
+        with open(self._log_path(data["id"]), "wb") as f:
+            f.writelines(self._dump_message(msg) for msg in messages)
+        self._write_header(data)
+        
+        logger.info(f"🔄 Conversation convertie au format JSONL: {data['id']}")
+    
+    def _extract_metadata(self, data: Dict) -> Dict:
+        """
+        Extrait les métadonnées d'une conversation (sans les messages)
+        
+        Args:
+            data: Données complètes de la conversation
+        
+        Returns:
+            Métadonnées utilisées par la sidebar
+        """
+        return {
+            "id": data["id"],
+            "title": data["title"],
+            "display_title": data.get("display_title") or self._make_display_title(data["title"]),
+            "tooltip": data.get("tooltip") or self._make_tooltip(
+                data.get("message_count", 0), data.get("updated_at", "")
+            ),
+            "created_at": data.get("created_at", ""),
+            "updated_at": data.get("updated_at", ""),
+            "message_count": data.get("message_count", 0)
+        }
+    
+    @staticmethod
+    def _make_tooltip(message_count: int, updated_at: str) -> str:
+        """Légende d'une conversation dans la sidebar (nombre de messages • dernière mise à jour)"""
+        return f"{message_count} messages • {updated_at}"
+    
+    @staticmethod
+    def _make_display_title(title: str, max_length: int = 25) -> str:
+        """
+        Tronque un titre pour l'affichage dans la sidebar
+        
+        Args:
+            title: Titre complet
+            max_length: Nombre maximal de caractères conservés
+        
+        Returns:
+            Titre tronqué (suffixé de "..." si nécessaire)
+        """
+        return title if len(title) <= max_length else title[:max_length] + "..."
+    
     def generate_conversation_id(self) -> str:
         """
         Génère un ID unique pour une nouvelle conversation
         
+        Le suffixe aléatoire évite que deux sessions ouvertes dans la même
+        seconde écrivent dans le même journal.
+        
         Returns:
-            ID au format conv_YYYYMMDD_HHMMSS
+            ID au format conv_YYYYMMDD_HHMMSS_xxxxxxxx
         """
-        return f"conv_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
\ No newline at end of file
+        return f"conv_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
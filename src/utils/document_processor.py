@@ -10,7 +10,7 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from loguru import logger
 
-from src.config.settings import CHUNK_SIZE, CHUNK_OVERLAP
+from src.config.settings import CHUNK_SIZE, CHUNK_OVERLAP, SUPPORTED_EXTENSIONS
 
 
 class DocumentProcessor:
@@ -236,7 +236,6 @@ class DocumentProcessor:
             return False, "Le fichier n'existe pas"
         
         # Vérifier l'extension
-        from src.config.settings import SUPPORTED_EXTENSIONS
         if file_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
             return False, f"Extension non supportée. Utilisez: {', '.join(SUPPORTED_EXTENSIONS)}"
         
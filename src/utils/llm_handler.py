@@ -1,7 +1,10 @@
 """
 Gestion de l'intégration LLM (OpenAI)
 """
-from typing import List, Dict, Optional
+import time
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Dict, Optional, Tuple
 from langchain.schema import Document, HumanMessage, AIMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 from loguru import logger
@@ -10,15 +13,28 @@ from src.config.settings import (
     LLM_MODEL, 
     LLM_TEMPERATURE, 
     MAX_TOKENS, 
+    MAX_HISTORY_TURNS,
     OPENAI_API_KEY,
-    TOP_K_RESULTS
+    TOP_K_RESULTS,
+    SEMANTIC_CACHE_THRESHOLD
 )
 from src.utils.vector_store import VectorStoreManager
+from src.utils.semantic_cache import SemanticCache
 
 
 class LLMHandler:
     """Gestionnaire des interactions avec le LLM"""
     
+    # Cache LRU des réponses (question + historique récent + version de la base)
+    RESPONSE_CACHE_SIZE = 256
+    RESPONSE_CACHE_TTL_SECONDS = 3600
+    
+    # Recherche des questions de suivi : questions précédentes ajoutées à la
+    # recherche (poids réduit), résultats fusionnés par rangs réciproques (RRF)
+    RETRIEVAL_PRIOR_QUESTIONS = 2
+    PRIOR_QUESTION_WEIGHT = 0.5
+    RRF_K = 60
+    
     # ✅ PROMPT SYSTÈME CENTRALISÉ (attribut de classe)
     SYSTEM_PROMPT = """Tu es un assistant juridique expert travaillant pour le cabinet d'avocats d'Emilia Parenti, spécialisé en droit des affaires à Paris.
 
@@ -54,6 +70,15 @@ FORMAT DE RÉPONSE :
             openai_api_key=OPENAI_API_KEY
         )
         
+        # Tokenizer tiktoken, chargé au premier comptage (voir count_tokens)
+        self._encoding = None
+        
+        # Handler partagé entre sessions (st.cache_resource) : cache protégé par un verrou
+        self._response_cache: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Réponses aux questions sans historique, retrouvées par proximité sémantique
+        self._semantic_cache = SemanticCache(SEMANTIC_CACHE_THRESHOLD)
+        
         logger.info(
             f"✅ LLM Handler initialisé "
             f"(model: {LLM_MODEL}, temp: {LLM_TEMPERATURE}, max_tokens: {MAX_TOKENS})"
@@ -74,42 +99,20 @@ FORMAT DE RÉPONSE :
         Returns:
             Dictionnaire contenant answer, sources, relevant_chunks
         """
+        cache_key = self._make_cache_key(question, chat_history)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"♻️ Réponse servie depuis le cache: '{question[:100]}...'")
+            return cached
+        
         try:
-            # Vérifier si la base vectorielle contient des documents
-            doc_count = self.vector_store_manager.get_document_count()
-            if doc_count == 0:
-                logger.warning("⚠️ Base vectorielle vide")
-                return {
-                    "answer": (
-                        "❌ Aucun document n'a été chargé dans la base. "
-                        "Veuillez d'abord uploader des documents dans la section "
-                        "'📄 Gestion des Documents'."
-                    ),
-                    "sources": [],
-                    "relevant_chunks": 0
-                }
+            semantic_key, cached = self._semantic_lookup(question, chat_history)
+            if cached is not None:
+                return cached
             
-            logger.info(f"💬 Question reçue: '{question[:100]}...'")
-            
-            # Rechercher les documents pertinents
-            relevant_docs = self.vector_store_manager.similarity_search(
-                question, 
-                k=TOP_K_RESULTS
-            )
-            
-            if not relevant_docs:
-                logger.warning("⚠️ Aucun document pertinent trouvé")
-                return {
-                    "answer": (
-                        "❌ Aucun document pertinent trouvé pour répondre à votre question. "
-                        "Essayez de reformuler ou vérifiez que les documents uploadés "
-                        "contiennent des informations sur ce sujet."
-                    ),
-                    "sources": [],
-                    "relevant_chunks": 0
-                }
-            
-            logger.info(f"✅ {len(relevant_docs)} chunks pertinents trouvés")
+            relevant_docs, fallback = self._retrieve_documents(question, chat_history, semantic_key)
+            if fallback is not None:
+                return fallback
             
             # Construire le contexte
             context = self._build_context(relevant_docs)
@@ -130,11 +133,14 @@ FORMAT DE RÉPONSE :
                 f"({len(answer)} caractères, {len(sources)} sources)"
             )
             
-            return {
+            result = {
                 "answer": answer,
                 "sources": sources,
                 "relevant_chunks": len(relevant_docs)
             }
+            # Seules les réponses abouties sont mises en cache (pas les erreurs passagères)
+            self._cache_response(cache_key, result, semantic_key)
+            return result
             
         except Exception as e:
             logger.error(f"❌ Erreur lors de la génération de réponse: {e}")
@@ -144,6 +150,285 @@ FORMAT DE RÉPONSE :
                 "relevant_chunks": 0
             }
     
+    def stream_response(
+        self, 
+        question: str, 
+        chat_history: Optional[List[Dict]] = None
+    ) -> Tuple[Iterator[str], List[str]]:
+        """
+        Génère une réponse en streaming (morceaux de texte au fil de la génération)
+        
+        La recherche des documents est faite immédiatement ; l'appel au LLM
+        n'a lieu qu'à la consommation de l'itérateur.
+        
+        Args:
+            question: Question de l'utilisateur
+            chat_history: Historique de conversation (optionnel)
+            
+        Returns:
+            (itérateur des morceaux de la réponse, sources)
+        """
+        cache_key = self._make_cache_key(question, chat_history)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"♻️ Réponse servie depuis le cache: '{question[:100]}...'")
+            return iter([cached["answer"]]), cached["sources"]
+        
+        try:
+            semantic_key, cached = self._semantic_lookup(question, chat_history)
+            if cached is not None:
+                return iter([cached["answer"]]), cached["sources"]
+            
+            relevant_docs, fallback = self._retrieve_documents(question, chat_history, semantic_key)
+            if fallback is not None:
+                return iter([fallback["answer"]]), []
+            
+            context = self._build_context(relevant_docs)
+            messages = self._build_prompt(question, context, chat_history)
+            sources = self._extract_sources(relevant_docs)
+            
+            return self._stream_answer(messages, (cache_key, semantic_key), sources, len(relevant_docs)), sources
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la génération de réponse: {e}")
+            return iter([f"❌ Erreur lors de la génération de la réponse: {str(e)}"]), []
+    
+    def _stream_answer(
+        self,
+        messages: List,
+        cache_keys: Tuple,
+        sources: List[str],
+        relevant_chunks: int
+    ) -> Iterator[str]:
+        """
+        Appelle le LLM en streaming et met la réponse complète en cache à la fin
+        
+        Args:
+            messages: Prompt construit par _build_prompt
+            cache_keys: (clé du cache exact, clé du cache sémantique ou None)
+            sources: Sources des documents utilisés
+            relevant_chunks: Nombre de chunks utilisés
+            
+        Yields:
+            Morceaux de la réponse
+        """
+        logger.info(f"🤖 Appel au LLM en streaming ({LLM_MODEL})...")
+        parts = []
+        
+        try:
+            for chunk in self.llm.stream(messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la génération de réponse: {e}")
+            yield f"\n\n❌ Erreur lors de la génération de la réponse: {str(e)}"
+            return
+        
+        answer = "".join(parts)
+        logger.info(
+            f"✅ Réponse générée avec succès "
+            f"({len(answer)} caractères, {len(sources)} sources)"
+        )
+        self._cache_response(cache_keys[0], {
+            "answer": answer,
+            "sources": sources,
+            "relevant_chunks": relevant_chunks
+        }, cache_keys[1])
+    
+    def _retrieve_documents(
+        self,
+        question: str,
+        chat_history: Optional[List[Dict]] = None,
+        semantic_key: Optional[Tuple] = None
+    ) -> Tuple[Optional[List[Document]], Optional[Dict]]:
+        """
+        Recherche les documents pertinents pour une question
+        
+        Args:
+            question: Question de l'utilisateur
+            chat_history: Historique de conversation (ses dernières questions précisent la recherche)
+            semantic_key: (embedding de la question, version de la base) si déjà calculé
+            
+        Returns:
+            (documents pertinents, None) ou (None, réponse de repli si base vide
+            ou aucun document pertinent)
+        """
+        # Vérifier si la base vectorielle contient des documents
+        doc_count = self.vector_store_manager.get_document_count()
+        if doc_count == 0:
+            logger.warning("⚠️ Base vectorielle vide")
+            return None, {
+                "answer": (
+                    "❌ Aucun document n'a été chargé dans la base. "
+                    "Veuillez d'abord uploader des documents dans la section "
+                    "'📄 Gestion des Documents'."
+                ),
+                "sources": [],
+                "relevant_chunks": 0
+            }
+        
+        logger.info(f"💬 Question reçue: '{question[:100]}...'")
+        
+        # Rechercher les documents pertinents
+        prior_questions = [
+            msg["content"] for msg in reversed(self._prior_messages(question, chat_history))
+            if msg["role"] == "user"
+        ][:self.RETRIEVAL_PRIOR_QUESTIONS]
+        
+        if semantic_key is not None:
+            relevant_docs = self.vector_store_manager.similarity_search_by_vector(
+                semantic_key[0],
+                k=TOP_K_RESULTS
+            )
+        elif prior_questions:
+            results = self.vector_store_manager.batch_similarity_search(
+                [question] + prior_questions,
+                k=TOP_K_RESULTS
+            )
+            relevant_docs = self._fuse_results(results)
+        else:
+            relevant_docs = self.vector_store_manager.similarity_search(
+                question, 
+                k=TOP_K_RESULTS
+            )
+        
+        if not relevant_docs:
+            logger.warning("⚠️ Aucun document pertinent trouvé")
+            return None, {
+                "answer": (
+                    "❌ Aucun document pertinent trouvé pour répondre à votre question. "
+                    "Essayez de reformuler ou vérifiez que les documents uploadés "
+                    "contiennent des informations sur ce sujet."
+                ),
+                "sources": [],
+                "relevant_chunks": 0
+            }
+        
+        logger.info(f"✅ {len(relevant_docs)} chunks pertinents trouvés")
+        return relevant_docs, None
+    
+    def _semantic_lookup(
+        self,
+        question: str,
+        chat_history: Optional[List[Dict]]
+    ) -> Tuple[Optional[Tuple], Optional[Dict]]:
+        """
+        Cherche la réponse d'une question proche dans le cache sémantique
+        
+        Seules les questions sans échange précédent sont concernées : une
+        question de suivi dépend de l'historique, pas seulement de son texte.
+        
+        Args:
+            question: Question de l'utilisateur
+            chat_history: Historique de conversation (peut finir par la question elle-même)
+            
+        Returns:
+            ((embedding de la question, version de la base) ou None, réponse en cache ou None)
+        """
+        if self._prior_messages(question, chat_history) or self.vector_store_manager.get_document_count() == 0:
+            return None, None
+        
+        try:
+            store_version = self.vector_store_manager.version
+            embedding = self.vector_store_manager.embed_query(question)
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding de la question impossible: {e}")
+            return None, None
+        
+        semantic_key = (embedding, store_version)
+        cached = self._semantic_cache.lookup(embedding, store_version)
+        if cached is not None:
+            logger.info("♻️ Réponse servie depuis le cache sémantique: '{}...'", question[:100])
+        return semantic_key, cached
+    
+    def _prior_messages(self, question: str, chat_history: Optional[List[Dict]]) -> List[Dict]:
+        """
+        Historique précédant la question (l'interface l'ajoute à l'historique avant l'appel)
+        
+        Args:
+            question: Question de l'utilisateur
+            chat_history: Historique de conversation (optionnel)
+            
+        Returns:
+            Messages antérieurs à la question
+        """
+        prior = list(chat_history or [])
+        if prior and prior[-1]["role"] == "user" and prior[-1]["content"] == question:
+            prior.pop()
+        return prior
+    
+    def _fuse_results(self, results: List[List[Document]]) -> List[Document]:
+        """
+        Fusionne les résultats de plusieurs recherches par rangs réciproques (RRF)
+        
+        Args:
+            results: Résultats par requête, la question courante en premier
+            
+        Returns:
+            Les TOP_K_RESULTS documents de meilleur score fusionné
+        """
+        scores: Dict[Tuple, float] = {}
+        documents: Dict[Tuple, Document] = {}
+        
+        for query_index, docs in enumerate(results):
+            weight = 1.0 if query_index == 0 else self.PRIOR_QUESTION_WEIGHT
+            for rank, doc in enumerate(docs):
+                key = (doc.metadata.get("source"), doc.metadata.get("chunk_index"), doc.page_content)
+                documents.setdefault(key, doc)
+                scores[key] = scores.get(key, 0.0) + weight / (self.RRF_K + rank + 1)
+        
+        ranked = sorted(scores, key=scores.get, reverse=True)[:TOP_K_RESULTS]
+        return [documents[key] for key in ranked]
+    
+    def _make_cache_key(self, question: str, chat_history: Optional[List[Dict]]) -> Tuple:
+        """
+        Construit la clé de cache d'une réponse
+        
+        Args:
+            question: Question de l'utilisateur
+            chat_history: Historique de conversation (seuls les messages envoyés au LLM comptent)
+            
+        Returns:
+            Clé (question, historique récent, version de la base vectorielle)
+        """
+        history = tuple(
+            (msg["role"], msg["content"]) for msg in self._history_window(chat_history)
+        )
+        return (question.strip(), history, self.vector_store_manager.version)
+    
+    @staticmethod
+    def _history_window(chat_history: Optional[List[Dict]]) -> List[Dict]:
+        """Derniers MAX_HISTORY_TURNS échanges de l'historique (aucun si 0)"""
+        history = chat_history or []
+        return history[max(len(history) - 2 * MAX_HISTORY_TURNS, 0):]
+    
+    def _get_cached_response(self, cache_key: Tuple) -> Optional[Dict]:
+        """Retourne une copie de la réponse en cache si elle n'a pas expiré"""
+        with self._cache_lock:
+            entry = self._response_cache.get(cache_key)
+            if entry is None:
+                return None
+            
+            stored_at, result = entry
+            if time.monotonic() - stored_at > self.RESPONSE_CACHE_TTL_SECONDS:
+                del self._response_cache[cache_key]
+                return None
+            
+            self._response_cache.move_to_end(cache_key)
+            return {**result, "sources": list(result["sources"])}
+    
+    def _cache_response(self, cache_key: Tuple, result: Dict, semantic_key: Optional[Tuple] = None):
+        """Ajoute une réponse au cache LRU (et au cache sémantique si la question a été vectorisée)"""
+        with self._cache_lock:
+            self._response_cache[cache_key] = (time.monotonic(), {**result, "sources": list(result["sources"])})
+            self._response_cache.move_to_end(cache_key)
+            while len(self._response_cache) > self.RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+        
+        if semantic_key is not None:
+            self._semantic_cache.add(semantic_key[0], semantic_key[1], result)
+    
     def _build_context(self, documents: List[Document]) -> str:
         """
         Construit le contexte à partir des documents pertinents
@@ -202,9 +487,9 @@ Réponds à la question en te basant UNIQUEMENT sur le contexte ci-dessus. N'inv
         # Construction de la liste de messages
         messages = [system_message]
         
-        # Ajouter l'historique si disponible (garder les 6 derniers messages = 3 échanges)
+        # Ajouter l'historique si disponible (garder les MAX_HISTORY_TURNS derniers échanges)
         if chat_history:
-            for msg in chat_history[-6:]:
+            for msg in self._history_window(chat_history):
                 if msg["role"] == "user":
                     messages.append(HumanMessage(content=msg["content"]))
                 elif msg["role"] == "assistant":
@@ -248,9 +533,11 @@ Réponds à la question en te basant UNIQUEMENT sur le contexte ci-dessus. N'inv
             Nombre approximatif de tokens
         """
         try:
-            import tiktoken
-            encoding = tiktoken.encoding_for_model(LLM_MODEL)
-            tokens = encoding.encode(text)
+            if self._encoding is None:
+                import tiktoken
+                # Tokenizer chargé une seule fois : le handler est partagé (st.cache_resource)
+                self._encoding = tiktoken.encoding_for_model(LLM_MODEL)
+            tokens = self._encoding.encode(text)
             return len(tokens)
         except Exception as e:
             logger.warning(f"⚠️ Impossible de compter les tokens: {e}. Estimation grossière.")
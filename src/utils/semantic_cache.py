@@ -0,0 +1,126 @@
+"""
+Cache sémantique des réponses (questions proches => même réponse)
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from loguru import logger
+
+
+class SemanticCache:
+    """
+    Cache des réponses indexé par l'embedding de la question
+    
+    Une question dont l'embedding est assez proche (similarité cosinus) d'une
+    question déjà traitée reçoit la réponse enregistrée, sans recherche ni
+    appel au LLM. Le cache est vidé dès que la base vectorielle change.
+    """
+    
+    # Nombre d'entrées gardées (LRU) et durée de vie d'une entrée
+    MAX_ENTRIES = 512
+    TTL_SECONDS = 3600
+    
+    def __init__(self, threshold: float):
+        """
+        Initialise le cache
+        
+        Args:
+            threshold: Similarité cosinus minimale pour servir une réponse (0 à 1)
+        """
+        self.threshold = threshold
+        
+        # {id: (date d'ajout, embedding normalisé, réponse)} ; partagé entre
+        # sessions (handler en st.cache_resource), donc protégé par un verrou
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # Version de la base vectorielle des réponses en cache
+        self._store_version: Optional[int] = None
+        # Matrice des embeddings (une ligne par entrée), reconstruite après modification
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+    
+    def lookup(self, embedding: List[float], store_version: int) -> Optional[Dict]:
+        """
+        Cherche une réponse enregistrée pour une question proche
+        
+        Args:
+            embedding: Embedding de la question
+            store_version: Version courante de la base vectorielle
+        
+        Returns:
+            Copie de la réponse, ou None si aucune question assez proche
+        """
+        query = self._normalize(embedding)
+        
+        with self._lock:
+            self._check_version(store_version)
+            self._evict_expired()
+            if not self._entries:
+                return None
+            
+            if self._matrix is None:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.vstack([self._entries[i][1] for i in self._matrix_ids])
+            
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            
+            entry_id = self._matrix_ids[best]
+            self._entries.move_to_end(entry_id)
+            result = self._entries[entry_id][2]
+            logger.info("🧲 Cache sémantique: similarité {:.3f} (seuil {})", scores[best], self.threshold)
+            return {**result, "sources": list(result["sources"])}
+    
+    def add(self, embedding: List[float], store_version: int, result: Dict):
+        """
+        Enregistre la réponse à une question
+        
+        Args:
+            embedding: Embedding de la question
+            store_version: Version de la base vectorielle utilisée pour la réponse
+            result: Réponse (answer, sources, relevant_chunks)
+        """
+        vector = self._normalize(embedding)
+        
+        with self._lock:
+            # Base modifiée pendant la génération : la réponse est déjà périmée
+            if store_version != self._store_version:
+                return
+            self._entries[self._next_id] = (
+                time.monotonic(), vector, {**result, "sources": list(result["sources"])}
+            )
+            self._next_id += 1
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+            self._matrix = None
+    
+    def _check_version(self, store_version: int):
+        """Vide le cache si la base vectorielle a changé (appelé sous verrou)"""
+        if store_version != self._store_version:
+            self._entries.clear()
+            self._matrix = None
+            self._store_version = store_version
+    
+    def _evict_expired(self):
+        """Supprime les entrées expirées, les plus anciennes en premier (appelé sous verrou)"""
+        now = time.monotonic()
+        expired = [
+            entry_id for entry_id, (stored_at, _, _) in self._entries.items()
+            if now - stored_at > self.TTL_SECONDS
+        ]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self._matrix = None
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Embedding en vecteur float32 de norme 1 (produit scalaire = cosinus)"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
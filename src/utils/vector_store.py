@@ -12,7 +12,8 @@ from src.config.settings import (
     EMBEDDING_MODEL, 
     OPENAI_API_KEY,
     VECTOR_STORE_TYPE,
-    TOP_K_RESULTS
+    TOP_K_RESULTS,
+    FAISS_NUM_THREADS
 )
 
 # Import conditionnel selon configuration
@@ -52,6 +53,9 @@ class VectorStoreManager:
         else:  # chroma
             self.vector_store_path = VECTOR_STORE_DIR / "chroma_db"
         
+        if self.vector_store_type == "faiss":
+            self._configure_faiss_threads()
+        
         # Initialisation des embeddings
         self.embeddings = OpenAIEmbeddings(
             model=EMBEDDING_MODEL,
@@ -61,9 +65,21 @@ class VectorStoreManager:
         # Vector store (FAISS ou Chroma selon configuration)
         self.vector_store: Optional[Any] = None
         
+        # Incrémenté à chaque modification (sert de clé aux caches de l'interface)
+        self.version = 0
+        
         self._load_or_create()
         logger.info(f"✅ VectorStoreManager initialisé (type: {self.vector_store_type})")
     
+    def _configure_faiss_threads(self):
+        """Limite le pool OpenMP de FAISS à FAISS_NUM_THREADS threads"""
+        try:
+            import faiss
+            faiss.omp_set_num_threads(FAISS_NUM_THREADS)
+            logger.debug(f"🧵 FAISS limité à {FAISS_NUM_THREADS} threads OpenMP")
+        except Exception as e:
+            logger.warning(f"⚠️ Impossible de configurer les threads FAISS: {e}")
+    
     def _load_or_create(self):
         """Charge la base existante ou en crée une nouvelle"""
         if self.vector_store_path.exists():
@@ -148,6 +164,7 @@ class VectorStoreManager:
             
             # Sauvegarder automatiquement
             self.save()
+            self.version += 1
             return len(documents)
             
         except Exception as e:
@@ -193,6 +210,68 @@ class VectorStoreManager:
             logger.error(f"❌ Erreur lors de la recherche: {e}")
             return []
     
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Calcule l'embedding d'une requête (même modèle que l'indexation)
+        
+        Args:
+            query: Question de l'utilisateur
+            
+        Returns:
+            Embedding de la requête
+        """
+        return self.embeddings.embed_query(query)
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = None) -> List[Document]:
+        """
+        Recherche à partir d'un embedding déjà calculé (évite un second appel d'embedding)
+        
+        Args:
+            embedding: Embedding de la requête (voir embed_query)
+            k: Nombre de résultats (par défaut: TOP_K_RESULTS)
+            
+        Returns:
+            Liste de documents pertinents (triés par similarité décroissante)
+        """
+        if self.vector_store is None:
+            logger.warning("⚠️ Base vectorielle vide, aucune recherche possible")
+            return []
+        
+        if k is None:
+            k = TOP_K_RESULTS
+        
+        try:
+            results = self.vector_store.similarity_search_by_vector(embedding, k=k)
+            logger.info(f"✅ {len(results)} résultats trouvés")
+            return results
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la recherche: {e}")
+            return []
+    
+    def batch_similarity_search(self, queries: List[str], k: int = None) -> List[List[Document]]:
+        """
+        Recherche pour plusieurs requêtes, vectorisées en un seul appel d'embedding
+        
+        Args:
+            queries: Requêtes (la question courante et éventuellement les précédentes)
+            k: Nombre de résultats par requête (par défaut: TOP_K_RESULTS)
+            
+        Returns:
+            Une liste de documents par requête, dans l'ordre des requêtes
+        """
+        if self.vector_store is None:
+            logger.warning("⚠️ Base vectorielle vide, aucune recherche possible")
+            return [[] for _ in queries]
+        
+        try:
+            embeddings = self.embeddings.embed_documents(queries)
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la vectorisation des requêtes: {e}")
+            return [[] for _ in queries]
+        
+        logger.info(f"🔍 Recherche de similarité groupée ({len(queries)} requêtes)")
+        return [self.similarity_search_by_vector(embedding, k=k) for embedding in embeddings]
+    
     def similarity_search_with_score(
         self, 
         query: str, 
@@ -256,6 +335,7 @@ class VectorStoreManager:
                 
                 if ids_to_delete:
                     self.vector_store.delete(ids_to_delete)
+                    self.version += 1
                     logger.info(f"✅ {len(ids_to_delete)} chunks supprimés")
                     return True
                 else:
@@ -295,6 +375,7 @@ class VectorStoreManager:
                     self.vector_store = None
                 
                 self.save()
+                self.version += 1
                 return True
             
         except Exception as e:
@@ -438,6 +519,7 @@ class VectorStoreManager:
         try:
             # Effacer de la mémoire
             self.vector_store = None
+            self.version += 1
             
             # Supprimer les fichiers sur disque
             if self.vector_store_path.exists():